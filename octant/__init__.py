@@ -12,10 +12,12 @@ __all__ = ["RuntimeOpts", "RUNTIME"]
 class RuntimeOpts(threading.local):
     """Run-time configuration controller."""
 
-    def __init__(self, enable_progress_bar=False, progress_bar_lib=None):
+    def __init__(self, enable_progress_bar=False, progress_bar_lib=None, num_threads=1):
         """Initialise run-time configuration."""
         self.__dict__["enable_progress_bar"] = enable_progress_bar
         self.__dict__["progress_bar_lib"] = progress_bar_lib
+        # Number of OpenMP threads used by the compiled functions in octant.utils
+        self.__dict__["num_threads"] = num_threads
 
     def __repr__(self):
         """Repr of run-time configuration."""
@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 """Classes and functions for the analysis of cyclone tracking output."""
+import json
 import operator
+import os
+import shutil
+import sys
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from functools import partial
 from pathlib import Path
 
@@ -11,6 +16,7 @@ import pandas as pd
 
 import xarray as xr
 
+from . import RUNTIME
 from .decor import ReprTrackRun, get_pbar
 from .exceptions import (
     ArgumentError,
@@ -22,21 +28,360 @@ from .exceptions import (
     NotCategorisedError,
     SelectError,
 )
-from .grid import cell_bounds, cell_centres, grid_cell_areas
-from .io import ARCH_KEY, ARCH_KEY_CAT, PMCTRACKLoader
+from .grid import Grid
+from .io import (
+    ARCH_KEY,
+    ARCH_KEY_CAT,
+    ARCH_KEY_OFFSETS,
+    MEMMAP_INDEX,
+    PARQUET_PARTITIONS,
+    HDFTrackReader,
+    PMCTRACKLoader,
+)
 from .misc import _exclude_by_first_day, _exclude_by_last_day
-from .params import EARTH_RADIUS, FILLVAL, HOUR, KM2M, MUX_NAMES
-from .parts import OctantTrack, TrackSettings
+from .params import EARTH_RADIUS, FILLVAL, HOUR, KM2M, M2KM, MUX_NAMES
+from .parts import OctantTrack, TrackColumns, TrackSettings
 from .utils import (
-    distance_metric,
+    distance_matrix,
     great_circle,
-    point_density_cell,
-    point_density_rad,
-    track_density_cell,
-    track_density_rad,
+    great_circle_arr,
+    point_density_cell_1d,
+    point_density_rad_1d,
+    track_density_cell_1d,
+    track_density_rad_1d,
 )
 
 
+def _match_candidates(df1, df2, check_time=True, bbox_dist=None, r_planet=EARTH_RADIUS):
+    """
+    Find candidate pairs of tracks that can match each other.
+
+    Parameters
+    ----------
+    df1, df2: octant.parts.OctantTrack
+        Multi-index DataFrames of tracks
+    check_time: bool, optional
+        Keep only pairs of tracks overlapping in time (including the end points)
+    bbox_dist: float, optional
+        If given, keep only pairs of tracks whose lon-lat bounding boxes are
+        within this distance (in metres) from each other
+    r_planet: float, optional
+        Radius of the planet in metres
+        Default: EARTH_RADIUS
+
+    Returns
+    -------
+    candidates: dict
+        Track indices of `df2` (in ascending order) for each track index of `df1`
+    """
+    cols1 = TrackColumns.from_df(df1)
+    cols2 = TrackColumns.from_df(df2)
+    ids1, ids2 = cols1.track_ids, cols2.track_ids
+    ext1 = _track_extents(cols1)
+    ext2 = _track_extents(cols2)
+    if check_time:
+        # Interval index: tracks of df2 sorted by their start time
+        order = np.argsort(ext2["t0"], kind="stable")
+        sorted_start = ext2["t0"][order]
+    if bbox_dist is not None:
+        ang = bbox_dist / r_planet
+        dlat = np.rad2deg(ang)
+    candidates = {}
+    for k, idx in enumerate(ids1):
+        if check_time:
+            cand = order[: np.searchsorted(sorted_start, ext1["t1"][k], side="right")]
+            cand = cand[ext2["t1"][cand] >= ext1["t0"][k]]
+        else:
+            cand = np.arange(ids2.shape[0])
+        if bbox_dist is not None:
+            cand = cand[
+                (ext2["lat0"][cand] - dlat <= ext1["lat1"][k])
+                & (ext2["lat1"][cand] + dlat >= ext1["lat0"][k])
+            ]
+            # Maximum difference in longitude at the highest latitude of the two boxes
+            max_lat = np.maximum(
+                np.maximum(abs(ext2["lat0"][cand]), abs(ext2["lat1"][cand])),
+                max(abs(ext1["lat0"][k]), abs(ext1["lat1"][k])),
+            )
+            with np.errstate(invalid="ignore"):
+                dlon = np.rad2deg(np.arcsin(np.sin(ang) / np.cos(np.deg2rad(max_lat + dlat))))
+            dlon[(max_lat + dlat >= 90) | np.isnan(dlon)] = np.inf
+            # Check periodic copies of the boxes too, for tracks on both sides of the 0/360 seam
+            near = np.zeros(cand.shape[0], dtype=bool)
+            for shift in (-360.0, 0.0, 360.0):
+                near |= (ext2["lon0"][cand] + shift - dlon <= ext1["lon1"][k]) & (
+                    ext2["lon1"][cand] + shift + dlon >= ext1["lon0"][k]
+                )
+            cand = cand[near]
+        candidates[idx] = ids2[np.sort(cand)]
+    return candidates
+
+
+_TRACK_STATS = ["lifetime_h", "gen_lys_dist_km", "total_dist_km", "average_speed", "max_vort"]
+_RULE_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def _eval_rule(rule, stats):
+    """
+    Evaluate a classification rule for all tracks.
+
+    Parameters
+    ----------
+    rule: str
+        Expression of the form "metric op value", where op is one of <, <=, >, >=, ==, !=,
+        or "metric pct q", which selects tracks at or above the q-th percentile of the metric
+    stats: pandas.DataFrame
+        Table of track properties, see `octant.core.TrackRun.track_stats`
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean array, one value for each track
+    """
+    try:
+        metric, op, value = rule.split()
+        value = float(value)
+    except ValueError:
+        raise ArgumentError(f"Rule '{rule}' should be of the form 'metric op value'")
+    if metric not in stats.columns:
+        raise ArgumentError(f"'{metric}' should be one of {list(stats.columns)}")
+    arr = stats[metric].values
+    if op == "pct":
+        if arr.shape[0] == 0:
+            return np.zeros(0, dtype=bool)
+        op, value = ">=", np.nanpercentile(arr, value)
+    if op not in _RULE_OPS:
+        raise ArgumentError(f"Operator '{op}' should be one of {[*_RULE_OPS, 'pct']}")
+    with np.errstate(invalid="ignore"):
+        return _RULE_OPS[op](arr, value)
+
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+
+class _SharedArray:
+    """
+    Picklable reference to a copy of an array in shared memory.
+
+    Only the name, shape and dtype of the block are pickled, so the array
+    is copied once, and not sent to each of the worker processes.
+    """
+
+    def __init__(self, arr):
+        self.da_kw = None
+        if isinstance(arr, xr.DataArray):
+            # Keep coordinates and metadata of the DataArray, but not its data
+            self.da_kw = {
+                "dims": arr.dims,
+                "coords": {k: c.variable for k, c in arr.coords.items()},
+                "name": arr.name,
+                "attrs": arr.attrs,
+            }
+            arr = arr.values
+        arr = np.ascontiguousarray(arr)
+        self.shape, self.dtype = arr.shape, arr.dtype
+        self._shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        self.name = self._shm.name
+        np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)[...] = arr
+
+    def __getstate__(self):  # noqa
+        return {k: v for k, v in self.__dict__.items() if k != "_shm"}
+
+    def attach(self):
+        """Get the array (or DataArray) from shared memory in a worker process."""
+        try:
+            # Do not let the worker process unlink the block on exit
+            self._shm = shared_memory.SharedMemory(name=self.name, track=False)
+        except TypeError:  # Python < 3.13
+            self._shm = shared_memory.SharedMemory(name=self.name)
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        arr = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+        if self.da_kw is not None:
+            return xr.DataArray(arr, **self.da_kw)
+        return arr
+
+    def release(self):
+        """Free shared memory."""
+        self._shm.close()
+        if sys.version_info < (3, 13):
+            # Workers attached to the block may have unregistered it from the resource tracker
+            # shared with this process, and unlink() unregisters it once more
+            resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+
+def _share_args(func, shared):
+    """Replace array arguments of a partial function with references to shared memory."""
+    if shared_memory is None or not isinstance(func, partial):
+        return func
+
+    def _share(v):
+        if isinstance(v, (xr.DataArray, np.ndarray)) and v.dtype != object:
+            ref = _SharedArray(v)
+        else:
+            return v
+        shared.append(ref)
+        return ref
+
+    return partial(
+        _share_args(func.func, shared),
+        *[_share(v) for v in func.args],
+        **{k: _share(v) for k, v in func.keywords.items()},
+    )
+
+
+def _attach_args(func):
+    """Replace references to shared memory in a partial function with arrays."""
+    if not isinstance(func, partial):
+        return func
+
+    def _attach(v):
+        return v.attach() if isinstance(v, _SharedArray) else v
+
+    return partial(
+        _attach_args(func.func),
+        *[_attach(v) for v in func.args],
+        **{k: _attach(v) for k, v in func.keywords.items()},
+    )
+
+
+_WORKER_FUNCS = []
+_WORKER_SHARED_FUNCS = []
+
+
+def _classify_init(funcs):
+    """Initialise a worker process used by `TrackRun.classify()`."""
+    global _WORKER_FUNCS, _WORKER_SHARED_FUNCS
+    # Keep references to shared memory blocks while the process is alive
+    _WORKER_SHARED_FUNCS = funcs
+    _WORKER_FUNCS = [_attach_args(func) for func in funcs]
+
+
+def _classify_shard(df):
+    """Evaluate the functions of a worker process for each track in `df`."""
+    gb = df.gb
+    flags = np.ones((gb.ngroups, len(_WORKER_FUNCS)), dtype=bool)
+    for k, (_, ot) in enumerate(gb):
+        for j, func in enumerate(_WORKER_FUNCS):
+            flags[k, j] = bool(func(ot))
+    return flags
+
+
+def _track_extents(cols):
+    """Minimum and maximum values of coordinates of each track in TrackColumns."""
+    extents = {}
+    starts = cols.track_offsets[:-1]
+    for key, arr in zip(["lon", "lat", "t"], cols.coord_view):
+        if len(cols) == 0:
+            extents[f"{key}0"] = extents[f"{key}1"] = arr[:0]
+        else:
+            extents[f"{key}0"] = np.minimum.reduceat(arr, starts)
+            extents[f"{key}1"] = np.maximum.reduceat(arr, starts)
+    return extents
+
+
+def _cat_records(cats):
+    """Convert categories to a table of uint8 flags with track index as a column."""
+    return pd.DataFrame.from_records(cats.astype("uint8").to_records(index=True))
+
+
+def _same_day(time, m, d):
+    """Check if datetime64 values are on the given day and month."""
+    time = pd.DatetimeIndex(time)
+    return (time.month == m) & (time.day == d)
+
+
+def _density_counts(sub_df, grid, by, method, dist, exclude_first, exclude_last, r_planet):
+    """
+    Count track points on a grid; see `TrackRun.density()` for the description of parameters.
+
+    Returns
+    -------
+    data: numpy.ndarray
+        Unweighted density values
+    units: str
+        Units of density values
+    """
+    # Boundaries of grid cells
+    lon, lat = grid.bounds
+
+    # TODO: make this check more flexible
+    if (np.diff(lon) < 0).any() or (np.diff(lat) < 0).any():
+        raise GridError("Grid values must be in an ascending order")
+
+    # Select method
+    if method == "radius":
+        # Density is calculated at the points of the output grid
+        grid_args = grid.centres
+        # Convert radius to metres
+        dist_metres = dist * KM2M
+        units = f"per {round(np.pi * dist**2)} km2"
+        if by == "track":
+            cy_func = partial(track_density_rad_1d, dist=dist_metres, r_planet=r_planet)
+        else:
+            cy_func = partial(point_density_rad_1d, dist=dist_metres, r_planet=r_planet)
+    elif method == "cell":
+        units = "1"
+        # Points are binned using 1D cell boundaries directly
+        grid_args = grid.bounds
+        if by == "track":
+            cy_func = track_density_cell_1d
+        else:
+            cy_func = point_density_cell_1d
+    else:
+        raise ArgumentError("`method` should be one of radius|cell")
+
+    # Convert dataframe columns to C-ordered arrays
+    if by == "point":
+        sub_data = sub_df.lonlat_c
+    elif by == "track":
+        sub_data = sub_df.tridlonlat_c
+    elif by == "genesis":
+        sub_data = (
+            sub_df.gb.filter(_exclude_by_first_day, **exclude_first).xs(0, level="row_idx")
+        ).lonlat_c
+    elif by == "lysis":
+        sub_data = (
+            sub_df.gb.tail(1).gb.filter(_exclude_by_last_day, **exclude_last)
+        ).lonlat_c
+    else:
+        raise ArgumentError("`by` should be one of point|track|genesis|lysis")
+
+    data = cy_func(*grid_args, sub_data, num_threads=RUNTIME.num_threads).base
+    return data, units
+
+
+def _density_dataarray(data, grid, by, subset, method, units, weight_by_area, r_planet):
+    """Wrap density values into a DataArray, optionally weighting them by cell areas."""
+    if weight_by_area:
+        # calculate area in metres
+        area = grid.areas(r_planet=r_planet)
+        data /= area
+        data *= KM2M * KM2M  # convert to km^{-2}
+        units = "km-2"
+    # Prepare coordinates for output
+    xlon = xr.IndexVariable(dims="longitude", data=grid.centres[0], attrs={"units": "degrees_east"})
+    xlat = xr.IndexVariable(dims="latitude", data=grid.centres[1], attrs={"units": "degrees_north"})
+    dens = xr.DataArray(
+        data,
+        name=f"{by}_density",
+        attrs={"units": units, "subset": subset, "method": method},
+        dims=("latitude", "longitude"),
+        coords={"longitude": xlon, "latitude": xlat},
+    )
+    return dens
+
+
 class TrackRun:
     """
     Results of tracking experiment.
@@ -76,6 +421,10 @@ class TrackRun:
         self.conf = None
         mux = pd.MultiIndex.from_arrays([[], []], names=self._mux_names)
         self.columns = []
+        self._columns = None
+        self._archive = None
+        # Quantities derived from data and categories, e.g. track indices
+        self._cache = {}
         self.data = OctantTrack(index=mux, columns=self.columns)
         self.filelist = []
         self.sources = []
@@ -90,16 +439,44 @@ class TrackRun:
         elif self.dirname is not None:
             raise LoadError("To load data, `dirname` should be Path-like object")
 
-        if not self.data.empty:
-            # Define time step
-            for (_, ot) in self.gb:
-                if ot.shape[0] > 1:
-                    self.tstep_h = ot.time.diff().values[-1] / HOUR
-                    break
+        if self._data is None or not self._data.empty:
+            self._set_tstep()
+
+    def _set_tstep(self):
+        """Define time step from the last time interval of the first multi-point track."""
+        cols = self.as_columns()
+        if "time" not in cols.columns:
+            # E.g. a subset of columns read from an archive
+            return
+        (multi_point,) = np.nonzero(cols.lengths > 1)
+        if multi_point.shape[0] > 0:
+            end = cols.track_offsets[multi_point[0] + 1]
+            self.tstep_h = (cols["time"][end - 1] - cols["time"][end - 2]) / HOUR
 
     def __len__(self):
         """Get the number of cyclone tracks within TrackRun."""
-        return self.data.index.get_level_values(0).to_series().nunique()
+        if self._data is None:
+            return len(self._columns if self._columns is not None else self._archive)
+        return self._track_index()[0].shape[0]
+
+    def _track_index(self):
+        """
+        Get unique track indices in `TrackRun.data` and row offsets of each track.
+
+        Offsets are None if rows of a track are not contiguous. The result is cached
+        until `TrackRun.data` is reassigned.
+        """
+        if "track_index" not in self._cache:
+            track_idx = self.data.index.get_level_values(0).values
+            starts = np.flatnonzero(np.diff(track_idx) != 0) + 1
+            starts = np.concatenate([[0], starts]) if track_idx.shape[0] > 0 else starts
+            track_ids = track_idx[starts]
+            if pd.Index(track_ids).is_unique:
+                offsets = np.append(starts, track_idx.shape[0])
+            else:
+                track_ids, offsets = pd.unique(track_idx), None
+            self._cache["track_index"] = track_ids, offsets
+        return self._cache["track_index"]
 
     def __repr__(self):  # noqa
         rtr = ReprTrackRun(self)
@@ -115,32 +492,182 @@ class TrackRun:
 
     def __add__(self, other):
         """Combine two TrackRun objects together."""
-        new = self.__class__()
-        new.extend(self)
-        new.extend(other)
-        return new
+        return self.concat([self, other])
 
     def __getitem__(self, subset):  # noqa
         if (subset in [slice(None), None, "all"]) or len(self) == 0:
             return self.data
         else:
-            if self.is_categorised:
-                if isinstance(subset, str):
-                    subsets = [subset]
-                else:
-                    # if list of several subsets is given
-                    subsets = subset
-                selected = True
-                for label in subsets:
-                    if label not in self.cats.columns:
-                        raise SelectError(
-                            f"'{label}' is not among categories: {', '.join(self.cats.columns)}"
-                        )
-                    selected &= self.cats[label]
-                idx = self.cats[selected].index
-                return self.data.loc[idx, :]
+            idx = self._subset_index(subset)
+            if self._data is None and self._archive is not None:
+                # Read only the selected tracks
+                return self._archive.read(track_ids=idx)
+            track_ids, offsets = self._track_index()
+            if offsets is not None:
+                k = pd.Index(track_ids).get_indexer(idx)
+                if (k >= 0).all():
+                    # Take rows of the selected tracks by their offsets
+                    lengths = offsets[k + 1] - offsets[k]
+                    shift = np.repeat(offsets[k] - np.cumsum(lengths) + lengths, lengths)
+                    return self.data.iloc[np.arange(lengths.sum()) + shift]
+            return self.data.loc[idx, :]
+
+    def _subset_index(self, subset):
+        """Get indices of tracks in a subset given by category label(s)."""
+        if not self.is_categorised:
+            raise NotCategorisedError
+        if isinstance(subset, str):
+            subsets = [subset]
+        else:
+            # if list of several subsets is given
+            subsets = subset
+        selected = True
+        for label in subsets:
+            if label not in self.cats.columns:
+                raise SelectError(
+                    f"'{label}' is not among categories: {', '.join(self.cats.columns)}"
+                )
+            selected &= self.cats[label]
+        return self.cats[selected].index
+
+    @property
+    def data(self):
+        """DataFrame-like container of tracking locations, times, and other data."""
+        if self._data is None:
+            if self._columns is not None:
+                # Construct the DataFrame from the columnar storage on first access,
+                # and keep the columns for `as_columns()`
+                self._data = self._columns.to_df()
+                self._cache[("columns", None)] = self._columns
+                self._columns = None
             else:
-                raise NotCategorisedError
+                # Read all tracks from a lazily opened archive
+                self._data = self._archive.read()
+                self._archive = None
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._columns = None
+        self._archive = None
+        self._cache = {}
+
+    def _attach_columns(self, columns):
+        """Use columnar data as the data storage; the DataFrame is created on first access."""
+        self._columns = columns
+        self._data = None
+        self._archive = None
+        self._cache = {}
+        self.columns = pd.Index(list(columns.columns))
+
+    @property
+    def cats(self):
+        """Categories of tracks: boolean flags indexed by track index."""
+        return self._cats
+
+    @cats.setter
+    def cats(self, value):
+        self._cats = value
+        self._cache = {}
+
+    def as_columns(self, subset=None):
+        """
+        Get tracks as contiguous arrays of data columns and track offsets.
+
+        Parameters
+        ----------
+        subset: str, optional
+            Subset of tracks
+
+        Returns
+        -------
+        octant.parts.TrackColumns
+
+        See Also
+        --------
+        octant.core.TrackRun.from_columns
+
+        Note
+        ----
+        Columns created from `TrackRun.data` are cached until `TrackRun.data` or
+        `TrackRun.cats` is reassigned. In-place changes of the DataFrame are not detected.
+        """
+        if subset in [slice(None), None, "all"]:
+            if self._columns is not None:
+                return self._columns
+            key = ("columns", None)
+        else:
+            key = ("columns", subset if isinstance(subset, str) else tuple(subset))
+        if key not in self._cache:
+            if key[1] is not None and len(self) > 0 and self._archive is None:
+                # Take the subset from the columns of all tracks
+                cols = self.as_columns()
+                k = pd.Index(cols.track_ids).get_indexer(self._subset_index(subset))
+                self._cache[key] = cols.take(np.sort(k[k >= 0]))
+            else:
+                self._cache[key] = TrackColumns.from_df(self[subset])
+        return self._cache[key]
+
+    def iter_chunks(self, chunk_size=1000):
+        """
+        Iterate over chunks of whole tracks.
+
+        If the TrackRun is loaded lazily from an archive, each chunk is read from the file
+        when it is needed, so the whole dataset is never held in memory.
+
+        Parameters
+        ----------
+        chunk_size: int, optional
+            Number of tracks in each chunk
+
+        Yields
+        ------
+        octant.parts.OctantTrack
+            Multi-index dataframe of whole tracks
+
+        See Also
+        --------
+        octant.core.DensityAccumulator, octant.io.HDFTrackReader.iter_chunks
+        """
+        if self._data is None and self._archive is not None:
+            yield from self._archive.iter_chunks(chunk_size=chunk_size)
+            return
+        track_ids, offsets = self._track_index()
+        bounds = np.append(np.arange(0, len(track_ids), chunk_size), len(track_ids))
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if offsets is not None:
+                # Rows of each track are contiguous, so take rows of the chunk by position
+                a, b = offsets[start], offsets[stop]
+                yield self.data.iloc[a:b]
+            else:
+                yield self.data.loc[track_ids[start:stop]]
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Construct TrackRun object from columnar data.
+
+        The DataFrame in `TrackRun.data` is not created until it is accessed.
+
+        Parameters
+        ----------
+        columns: octant.parts.TrackColumns
+            Columns of tracking data
+
+        Returns
+        -------
+        octant.core.TrackRun
+
+        See Also
+        --------
+        octant.core.TrackRun.as_columns
+        """
+        out = cls()
+        out._attach_columns(columns)
+        if columns.n_points > 0:
+            out._set_tstep()
+        return out
 
     @property
     def cat_labels(self):
@@ -157,12 +684,40 @@ class TrackRun:
 
     @property
     def gb(self):
-        """Group by track index."""
-        return self.data.gb
+        """
+        Group by track index.
+
+        The groupby object is cached until `TrackRun.data` or `TrackRun.cats` is reassigned.
+        In-place changes of the DataFrame (e.g. ``tr.data.drop(..., inplace=True)``)
+        are not detected, so reassign `TrackRun.data` after them.
+        """
+        gb, columns = self._cache.get("gb", (None, None))
+        if gb is None or columns != list(self.data.columns):
+            gb = self.data.gb
+            self._cache["gb"] = gb, list(self.data.columns)
+        return gb
 
     def size(self, subset=None):
-        """Size of subset of tracks."""
-        return self[subset].index.get_level_values(0).to_series().nunique()
+        """
+        Size of subset of tracks.
+
+        Sizes of subsets are cached until `TrackRun.data` or `TrackRun.cats` is reassigned.
+        In-place changes (e.g. ``tr.cats.loc[idx, "a"] = False``) are not detected,
+        so reassign the attribute after them, e.g. ``tr.cats = tr.cats``.
+        """
+        if subset in [slice(None), None, "all"] or len(self) == 0:
+            return len(self)
+        key = ("size", subset if isinstance(subset, str) else tuple(subset))
+        if key not in self._cache:
+            idx = self._subset_index(subset)
+            if self._data is None and self._archive is not None:
+                # Count tracks without reading them
+                self._cache[key] = len(idx)
+            elif self._data is None:
+                self._cache[key] = int(np.isin(idx, self._columns.track_ids).sum())
+            else:
+                self._cache[key] = int(np.isin(idx, self._track_index()[0]).sum())
+        return self._cache[key]
 
     def rename_cats(self, **mapping):
         """
@@ -178,7 +733,9 @@ class TrackRun:
         else:
             raise NotCategorisedError
 
-    def load_data(self, dirname, conf_file=None, loader_cls=PMCTRACKLoader):
+    def load_data(
+        self, dirname, conf_file=None, loader_cls=PMCTRACKLoader, loader_kw=None, cache_dir=None
+    ):
         """
         Read tracking results from a directory into `TrackRun.data` attribute.
 
@@ -192,6 +749,12 @@ class TrackRun:
         loader_cls: type, optional
             Loader with methods to load files.
             By default, `octant.io.PMCTRACKLoader` is used.
+        loader_kw: dict, optional
+            Keyword arguments passed to the loader, e.g. `n_workers` or `files_wildcard`
+        cache_dir: pathlib.Path, optional
+            If given, the loaded data are stored in this directory in a binary columnar
+            format and reused while the files and the loader class stay the same.
+            See `octant.io.CSVLoader.cache_key()`.
 
         See Also
         --------
@@ -213,12 +776,20 @@ class TrackRun:
                 warnings.warn(msg, MissingConfWarning)
 
         # Load the tracks
-        loader_obj = loader_cls(dirname=dirname)
-        self.data = loader_obj()
-        self.columns = self.data.columns
+        loader_obj = loader_cls(dirname=dirname, **(loader_kw or {}))
+        columns = None
+        if cache_dir is not None:
+            columns = loader_obj.read_cache(cache_dir)
+        if columns is None:
+            self.data = loader_obj()
+            self.columns = self.data.columns
+            if cache_dir is not None:
+                loader_obj.write_cache(cache_dir, TrackColumns.from_df(self.data))
+        else:
+            self._attach_columns(columns)
 
     @classmethod
-    def from_archive(cls, filename):
+    def from_archive(cls, filename, lazy=False):
         """
         Construct TrackRun object from HDF5 file.
 
@@ -226,14 +797,29 @@ class TrackRun:
         ----------
         filename: str
             File path to HDF5 file
+        lazy: bool, optional
+            Read only metadata and categories. Tracks are read when they are accessed,
+            and only the tracks of the requested category if subset by category.
+            Requires the file to be saved with `format="table"`.
 
         Returns
         -------
         octant.core.TrackRun
 
+        See Also
+        --------
+        octant.core.TrackRun.to_archive
         """
         with pd.HDFStore(filename, mode="r") as store:
-            df = store[ARCH_KEY]
+            if lazy:
+                if not store.get_storer(ARCH_KEY).is_table or ARCH_KEY_OFFSETS not in store:
+                    raise LoadError(
+                        "Lazy loading requires the archive to be saved with format='table'"
+                    )
+                offsets = store[ARCH_KEY_OFFSETS]
+                df = None
+            else:
+                df = store[ARCH_KEY]
             metadata = store.get_storer(ARCH_KEY).attrs.metadata
             if metadata["is_categorised"]:
                 try:
@@ -245,11 +831,14 @@ class TrackRun:
                         " replacing self.cats with an empty DataFrame."
                     )
                     warnings.warn(msg, InconsistencyWarning)
-                    df_cat = pd.DataFrame(
-                        index=df[cls._mux_names[0]].unique(), columns=[cls._mux_names[0]]
-                    )
+                    track_ids = offsets.index if lazy else df[cls._mux_names[0]].unique()
+                    df_cat = pd.DataFrame(index=track_ids, columns=[cls._mux_names[0]])
         out = cls()
-        if df.shape[0] > 0:
+        if lazy:
+            out._data = None
+            out._archive = HDFTrackReader(filename, offsets)
+            out._cache = {}
+        elif df.shape[0] > 0:
             out.data = OctantTrack.from_mux_df(df.set_index(cls._mux_names))
         else:
             out.data = OctantTrack.from_mux_df(df)
@@ -259,7 +848,7 @@ class TrackRun:
             out.cats = df_cat.set_index(cls._mux_names[0]).astype(bool)
         return out
 
-    def to_archive(self, filename):
+    def to_archive(self, filename, format="fixed"):
         """
         Save TrackRun and its metadata to HDF5 file.
 
@@ -267,24 +856,410 @@ class TrackRun:
         ----------
         filename: str
             File path to HDF5 file
+        format: str, optional
+            HDF5 format of the data table:
+             - "fixed": fast to write and read as a whole
+             - "table": queryable by track index and time, allows
+               `TrackRun.from_archive(filename, lazy=True)`
+
+        See Also
+        --------
+        octant.core.TrackRun.from_archive
         """
+        if format not in ("fixed", "table"):
+            raise ArgumentError(f"format should be 'fixed' or 'table', not {format}")
         with pd.HDFStore(filename, mode="w") as store:
-            if self.size() > 0:
-                df = pd.DataFrame.from_records(self.data.to_records(index=True))
+            if format == "table":
+                cols = self.as_columns()
+                df = pd.DataFrame(
+                    {
+                        self._mux_names[0]: cols.track_index,
+                        self._mux_names[1]: cols.row_idx,
+                        **cols.columns,
+                    },
+                    columns=[*self._mux_names, *self.columns],
+                )
+                store.put(ARCH_KEY, df, format="table", data_columns=[self._mux_names[0], "time"])
+                offsets = pd.DataFrame(
+                    {"start": cols.track_offsets[:-1], "stop": cols.track_offsets[1:]},
+                    index=pd.Index(cols.track_ids, name=self._mux_names[0]),
+                )
+                store.put(ARCH_KEY_OFFSETS, offsets, format="table")
             else:
-                df = pd.DataFrame(columns=self.columns, index=self.data.index)
-            store.put(ARCH_KEY, df)
-            metadata = {
-                k: v
-                for k, v in self.__dict__.items()
-                if k not in ["data", "filelist", "conf", "cats"]
-            }
-            metadata["conf"] = getattr(self.conf, "to_dict", lambda: {})()
-            store.get_storer(ARCH_KEY).attrs.metadata = metadata
+                if self.size() > 0:
+                    df = pd.DataFrame.from_records(self.data.to_records(index=True))
+                else:
+                    df = pd.DataFrame(columns=self.columns, index=self.data.index)
+                store.put(ARCH_KEY, df)
+            store.get_storer(ARCH_KEY).attrs.metadata = self._archive_metadata()
             # Store DataFrame with categorisation data
             if self.is_categorised:
-                df_cat = pd.DataFrame.from_records(self.cats.astype("uint8").to_records(index=True))
-                store.put(ARCH_KEY_CAT, df_cat)
+                store.put(ARCH_KEY_CAT, _cat_records(self.cats), format=format)
+
+    def append_to_archive(self, filename, adapt_conf=True):
+        """
+        Append tracks to an HDF5 file saved in table format, without rewriting existing data.
+
+        Track indices of the new tracks continue those in the file, categories are merged
+        (missing categories are filled with False), and the metadata are updated as in
+        `TrackRun.extend()`. If the file does not exist, it is created, and tracks
+        are numbered from 0.
+
+        Only rows of the new tracks are appended to the data, track offsets and categories
+        tables. The categories table is rewritten only if the new tracks have a category
+        that is not in the file.
+
+        Parameters
+        ----------
+        filename: str or pathlib.Path
+            File path to HDF5 file
+        adapt_conf: bool, optional
+            Merge TrackSettings (.conf attribute) of the stored and this TrackRun
+
+        See Also
+        --------
+        octant.core.TrackRun.to_archive, octant.core.TrackRun.consolidate_archive
+        """
+        is_new = not Path(filename).exists()
+        if is_new:
+            stored = self.__class__()
+            stored.columns = self.columns
+            offsets = pd.DataFrame(
+                {"start": [], "stop": []},
+                index=pd.Index([], name=self._mux_names[0]),
+                dtype=int,
+            )
+        else:
+            stored = self.from_archive(filename, lazy=True)
+            if list(stored.columns) != list(self.columns):
+                raise ConcatenationError(
+                    f"Data columns are different: {list(stored.columns)} != {list(self.columns)}"
+                )
+            offsets = pd.DataFrame(
+                {"start": stored._archive.starts, "stop": stored._archive.stops},
+                index=pd.Index(stored._archive.track_ids, name=self._mux_names[0]),
+            )
+        stored._extend_metadata(self, adapt_conf=adapt_conf)
+
+        first_id = offsets.index.max() + 1 if len(offsets) > 0 else 0
+        first_row = offsets["stop"].max() if len(offsets) > 0 else 0
+        cols = self.as_columns()
+        new_ids = first_id + np.arange(len(cols))
+        new_offsets = pd.DataFrame(
+            {"start": cols.track_offsets[:-1], "stop": cols.track_offsets[1:]},
+            index=pd.Index(new_ids, name=self._mux_names[0]),
+        )
+        new_offsets += first_row
+        df = pd.DataFrame(
+            {
+                self._mux_names[0]: np.repeat(new_ids, cols.lengths),
+                self._mux_names[1]: cols.row_idx,
+                **cols.columns,
+            },
+            columns=[*self._mux_names, *self.columns],
+        )
+        new_cats = None
+        if stored.is_categorised:
+            cats = self.cats if self.cats is not None else pd.DataFrame(index=cols.track_ids)
+            new_cats = cats.reindex(cols.track_ids).set_axis(new_offsets.index, axis=0)
+            labels = [] if stored.cats is None else list(stored.cats.columns)
+
+        with pd.HDFStore(filename, mode="a") as store:
+            if not is_new and not store.select(ARCH_KEY, start=0, stop=0).dtypes.equals(df.dtypes):
+                raise ConcatenationError("Data types are different from those in the file")
+            store.append(ARCH_KEY, df, data_columns=[self._mux_names[0], "time"])
+            if is_new or store.get_storer(ARCH_KEY_OFFSETS).is_table:
+                store.append(ARCH_KEY_OFFSETS, new_offsets)
+            else:
+                store.put(ARCH_KEY_OFFSETS, pd.concat([offsets, new_offsets]), format="table")
+            store.get_storer(ARCH_KEY).attrs.metadata = stored._archive_metadata()
+            if new_cats is not None:
+                if (
+                    ARCH_KEY_CAT in store
+                    and store.get_storer(ARCH_KEY_CAT).is_table
+                    and new_cats.columns.isin(labels).all()
+                ):
+                    new_cats = new_cats.reindex(columns=labels, fill_value=False).astype(bool)
+                    store.append(ARCH_KEY_CAT, _cat_records(new_cats))
+                else:
+                    # New category labels: the whole table is rewritten
+                    cats = pd.concat([stored.cats, new_cats], sort=False)
+                    cats = cats.astype("boolean").fillna(False).astype(bool)
+                    store.put(ARCH_KEY_CAT, _cat_records(cats), format="table")
+
+    @classmethod
+    def consolidate_archive(cls, filename):
+        """
+        Rewrite an HDF5 file in table format after appending to it.
+
+        The data are written in one contiguous table with indexed track index and time columns,
+        and the file space left after rewriting the categories table is reclaimed.
+
+        Parameters
+        ----------
+        filename: str or pathlib.Path
+            File path to HDF5 file
+
+        See Also
+        --------
+        octant.core.TrackRun.append_to_archive
+        """
+        filename = Path(filename)
+        tmp_filename = filename.with_name(f"{filename.name}.tmp")
+        cls.from_archive(filename).to_archive(tmp_filename, format="table")
+        with pd.HDFStore(tmp_filename, mode="a") as store:
+            store.create_table_index(ARCH_KEY, columns=[cls._mux_names[0], "time"], kind="full")
+        os.replace(tmp_filename, filename)
+
+    def _archive_metadata(self):
+        """Get attributes to be saved along with the data."""
+        metadata = {
+            k: v
+            for k, v in self.__dict__.items()
+            if k not in ["filelist", "conf", "cats"] and (not k.startswith("_") or k == "_cat_sep")
+        }
+        metadata["conf"] = getattr(self.conf, "to_dict", lambda: {})()
+        return metadata
+
+    def _json_metadata(self):
+        """Get attributes to be saved along with the data, converted to JSON-compatible types."""
+        metadata = self._archive_metadata()
+        metadata.update(
+            dirname=None if self.dirname is None else str(self.dirname),
+            columns=list(self.columns),
+            tstep_h=None if getattr(self, "tstep_h", None) is None else float(self.tstep_h),
+        )
+        return metadata
+
+    def _update_from_json_metadata(self, metadata):
+        """Set attributes from metadata created by `TrackRun._json_metadata()`."""
+        metadata = metadata.copy()
+        metadata["conf"] = TrackSettings.from_dict(metadata["conf"])
+        if metadata["dirname"] is not None:
+            metadata["dirname"] = Path(metadata["dirname"])
+        metadata["columns"] = pd.Index(metadata["columns"])
+        self.__dict__.update(metadata)
+
+    def to_memmap(self, path):
+        """
+        Save TrackRun to a directory of binary files that can be memory-mapped.
+
+        Each data column, as well as track offsets, indices and row indices, is stored
+        in a separate .npy file. Metadata, including `conf` and categories, are stored in
+        "metadata.json".
+
+        Parameters
+        ----------
+        path: pathlib.Path
+            Path to the directory; created if it does not exist
+
+        See Also
+        --------
+        octant.core.TrackRun.from_memmap
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        cols = self.as_columns()
+        for name, arr in cols.columns.items():
+            np.save(path / f"{name}.npy", np.ascontiguousarray(arr))
+        for name in MEMMAP_INDEX:
+            np.save(path / f"_{name}.npy", getattr(cols, name))
+        metadata = self._json_metadata()
+        if self.is_categorised:
+            metadata["cats"] = {
+                "index": self.cats.index.tolist(),
+                "columns": self.cats.columns.tolist(),
+                "data": self.cats.values.astype(bool).tolist(),
+            }
+        (path / "metadata.json").write_text(json.dumps(metadata))
+
+    @classmethod
+    def from_memmap(cls, path, mode="r"):
+        """
+        Construct TrackRun object backed by memory-mapped files.
+
+        Columns are not read into memory, so several processes opening the same directory
+        share one copy of the data through the page cache. Methods working on columns, e.g.
+        `TrackRun.track_stats()`, do not copy the data; `TrackRun.data` is created on access.
+
+        Parameters
+        ----------
+        path: pathlib.Path
+            Path to the directory created by `TrackRun.to_memmap()`
+        mode: str, optional
+            Mode of `numpy.memmap`; by default, the files are opened read-only
+
+        Returns
+        -------
+        octant.core.TrackRun
+
+        See Also
+        --------
+        octant.core.TrackRun.to_memmap
+        """
+        path = Path(path)
+        try:
+            metadata = json.loads((path / "metadata.json").read_text())
+        except FileNotFoundError:
+            raise LoadError(f"{path} is not a TrackRun memory-mapped store")
+        columns = {
+            name: np.load(path / f"{name}.npy", mmap_mode=mode) for name in metadata["columns"]
+        }
+        index = {name: np.load(path / f"_{name}.npy", mmap_mode=mode) for name in MEMMAP_INDEX}
+        out = cls.from_columns(TrackColumns(columns, **index))
+        cats = metadata.pop("cats", None)
+        out._update_from_json_metadata(metadata)
+        if out.is_categorised:
+            shape = (len(cats["index"]), len(cats["columns"]))
+            out.cats = pd.DataFrame(
+                np.array(cats["data"], dtype=bool).reshape(shape),
+                index=pd.Index(cats["index"], name=cls._mux_names[0]),
+                columns=cats["columns"],
+            )
+        return out
+
+    def to_parquet(self, path, partition_by=None):
+        """
+        Save TrackRun to a directory of Parquet files.
+
+        Metadata and categories are stored in the same directory,
+        in "_metadata.json" and "_categories.parquet" files respectively.
+        Requires `pyarrow`.
+
+        Parameters
+        ----------
+        path: pathlib.Path
+            Path to the directory. If it contains a TrackRun Parquet archive,
+            the archive is replaced; other non-empty directories are not overwritten.
+        partition_by: str or int, optional
+            Split data into subdirectories:
+             - "year": by the year of track points
+             - int: by ranges of track indices of this length
+
+        See Also
+        --------
+        octant.core.TrackRun.from_parquet
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        path = Path(path)
+        if path.is_dir() and any(path.iterdir()):
+            if not (path / "_metadata.json").is_file():
+                raise ArgumentError(f"{path} is not empty and is not a TrackRun Parquet archive")
+            # Remove all partitions, so that none of the old ones are read back
+            shutil.rmtree(path)
+        cols = self.as_columns()
+        arrays = {
+            self._mux_names[0]: cols.track_index,
+            self._mux_names[1]: cols.row_idx,
+            **cols.columns,
+        }
+        if partition_by == "year":
+            partition_col = PARQUET_PARTITIONS[0]
+            arrays[partition_col] = pd.DatetimeIndex(cols["time"]).year.values.astype("int32")
+        elif isinstance(partition_by, int) and partition_by > 0:
+            partition_col = PARQUET_PARTITIONS[1]
+            arrays[partition_col] = cols.track_index // partition_by
+        elif partition_by is None:
+            partition_col = None
+        else:
+            raise ArgumentError(f"partition_by should be 'year' or an integer, not {partition_by}")
+        table = pa.table(arrays)
+        ds.write_dataset(
+            table,
+            path,
+            format="parquet",
+            partitioning=[partition_col] if partition_col is not None else None,
+            partitioning_flavor="hive" if partition_col is not None else None,
+            basename_template="part-{i}.parquet",
+        )
+        metadata = self._json_metadata()
+        metadata["partition_by"] = partition_by
+        (path / "_metadata.json").write_text(json.dumps(metadata))
+        if self.is_categorised:
+            cats = self.cats.reset_index()
+            pq.write_table(
+                pa.Table.from_pandas(cats, preserve_index=False), path / "_categories.parquet"
+            )
+
+    @classmethod
+    def from_parquet(cls, path, columns=None, time_range=None):
+        """
+        Construct TrackRun object from a directory of Parquet files.
+
+        Only the requested columns and the partitions and row groups within the time range
+        are read. Columns are attached to the TrackRun without copying when the stored data
+        are already in order. Requires `pyarrow`.
+
+        Parameters
+        ----------
+        path: pathlib.Path
+            Path to the directory created by `TrackRun.to_parquet()`
+        columns: list of str, optional
+            Columns to read; by default, all columns are read. The time range is applied
+            even if "time" is not among the columns.
+        time_range: tuple, optional
+            Start and end time (inclusive); only track points in this range are read.
+            Categories of all tracks are kept, as in `TrackRun.time_slice()`.
+
+        Returns
+        -------
+        octant.core.TrackRun
+
+        See Also
+        --------
+        octant.core.TrackRun.to_parquet
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        path = Path(path)
+        try:
+            metadata = json.loads((path / "_metadata.json").read_text())
+        except FileNotFoundError:
+            raise LoadError(f"{path} is not a TrackRun Parquet archive")
+        partition_by = metadata.pop("partition_by")
+        dataset = ds.dataset(path, format="parquet", partitioning="hive")
+        if columns is None:
+            columns = metadata["columns"]
+        flt = None
+        if time_range is not None:
+            t0, t1 = [
+                # Nanosecond bounds regardless of the resolution pandas infers for `t`
+                pa.scalar(np.datetime64(pd.Timestamp(t).value, "ns"))
+                for t in time_range
+            ]
+            flt = (ds.field("time") >= t0) & (ds.field("time") <= t1)
+            if partition_by == "year":
+                # Prune partitions outside the time range
+                years = [pd.Timestamp(t).year for t in time_range]
+                flt &= (ds.field(PARQUET_PARTITIONS[0]) >= years[0]) & (
+                    ds.field(PARQUET_PARTITIONS[0]) <= years[1]
+                )
+        table = dataset.to_table(columns=[*cls._mux_names, *columns], filter=flt)
+
+        arrays = {k: table.column(k).to_numpy() for k in table.column_names}
+        track_index = arrays.pop(cls._mux_names[0])
+        row_idx = arrays.pop(cls._mux_names[1])
+        if track_index.shape[0] > 1:
+            order = np.lexsort((row_idx, track_index))
+            if (order != np.arange(order.shape[0])).any():
+                # Partitions are not in order of tracks
+                track_index, row_idx = track_index[order], row_idx[order]
+                arrays = {k: v[order] for k, v in arrays.items()}
+        track_ids, starts = np.unique(track_index, return_index=True)
+        offsets = np.append(starts, track_index.shape[0])
+        out = cls.from_columns(TrackColumns(arrays, offsets, track_ids=track_ids, row_idx=row_idx))
+
+        metadata["columns"] = columns
+        out._update_from_json_metadata(metadata)
+        if out.is_categorised:
+            cats = pq.read_table(path / "_categories.parquet").to_pandas()
+            out.cats = cats.set_index(cls._mux_names[0])
+        return out
 
     def extend(self, other, adapt_conf=True):
         """
@@ -297,9 +1272,114 @@ class TrackRun:
         adapt_conf: bool
             Merge TrackSettings (.conf attribute) of each of the TrackRuns
             This is done by retaining matching values and setting other to None
+
+        See Also
+        --------
+        octant.core.TrackRun.concat
+        """
+        self._assemble([self, other], adapt_conf=adapt_conf)
+
+    @classmethod
+    def concat(cls, trackruns, adapt_conf=True):
         """
+        Combine several TrackRun objects into a new one.
+
+        Tracks are renumbered consecutively, in the order of the TrackRuns, and the data
+        and categories are assembled at once. Categories of tracks that are not in the data
+        (e.g. after `TrackRun.time_slice()`) are kept and numbered along with the other tracks.
+        Metadata are merged as in `TrackRun.extend()`.
+
+        Parameters
+        ----------
+        trackruns: sequence of octant.core.TrackRun
+            TrackRuns to combine
+        adapt_conf: bool
+            Merge TrackSettings (.conf attribute) of each of the TrackRuns
+            This is done by retaining matching values and setting other to None
+
+        Returns
+        -------
+        octant.core.TrackRun
+
+        Examples
+        --------
+        >>> from octant.core import TrackRun
+        >>> runs = [TrackRun(path) for path in sorted(path_to_runs.glob("*"))]
+        >>> combined = TrackRun.concat(runs)
+        """
+        out = cls()
+        out._assemble(list(trackruns), adapt_conf=adapt_conf)
+        return out
+
+    def _assemble(self, trackruns, adapt_conf=True):
+        """Replace data and categories by those of several TrackRuns, renumbering tracks."""
+        n_tracks = len(self) if self in trackruns else 0
+        for other in trackruns:
+            if other is not self:
+                self._extend_metadata(other, adapt_conf=adapt_conf, size=n_tracks)
+                n_tracks += len(other)
+
+        trackruns = [tr for tr in trackruns if len(tr) > 0]
+        if len(trackruns) == 0:
+            return
+        blocks = [tr.as_columns() for tr in trackruns]
+        # Tracks of each TrackRun, including those present only in categories (e.g. after
+        # time_slice()), are renumbered consecutively, so categories stay aligned with data
+        run_ids = [
+            cols.track_ids if tr.cats is None else np.union1d(cols.track_ids, tr.cats.index)
+            for tr, cols in zip(trackruns, blocks)
+        ]
+        first_ids = np.cumsum([0] + [len(ids) for ids in run_ids])
+        track_ids = np.concatenate(
+            [
+                first_id + np.searchsorted(ids, cols.track_ids)
+                for cols, ids, first_id in zip(blocks, run_ids, first_ids)
+            ]
+        )
+        names = list(dict.fromkeys(name for cols in blocks for name in cols.columns))
+        if all(list(cols.columns) == names for cols in blocks):
+            points = np.cumsum([0] + [cols.n_points for cols in blocks])
+            new_cols = TrackColumns(
+                {name: np.concatenate([cols[name] for cols in blocks]) for name in names},
+                np.concatenate(
+                    [cols.track_offsets[:-1] + start for cols, start in zip(blocks, points)]
+                    + [points[-1:]]
+                ),
+                track_ids=track_ids,
+                row_idx=np.concatenate([cols.row_idx for cols in blocks]),
+            )
+            self._attach_columns(new_cols)
+        else:
+            # Data columns differ, so let pandas align them
+            new_data = pd.concat([cols.to_df() for cols in blocks], sort=False)
+            mux = pd.MultiIndex.from_arrays(
+                [
+                    np.repeat(track_ids, np.concatenate([cols.lengths for cols in blocks])),
+                    new_data.index.get_level_values(1),
+                ],
+                names=new_data.index.names,
+            )
+            self.data = new_data.set_index(mux)
+        self.columns = pd.Index(names)
+
+        # Concatenate categories
+        if any(tr.cats is not None for tr in trackruns):
+            new_cats = []
+            for tr, ids, first_id in zip(trackruns, run_ids, first_ids):
+                ix = pd.Index(first_id + np.arange(len(ids)), name=self._mux_names[0])
+                if tr.cats is None:
+                    new_cats.append(pd.DataFrame(index=ix))
+                else:
+                    new_cats.append(tr.cats.reindex(ids).set_axis(ix, axis=0))
+            new_cats = pd.concat(new_cats, sort=False)
+            self.cats = new_cats.astype("boolean").fillna(False).astype(bool)
+
+    def _extend_metadata(self, other, adapt_conf=True, size=None):
+        """Merge categorisation metadata, time step, conf and sources of another TrackRun."""
+        if size is None:
+            size = self.size()
         # Check if category metadata match
-        if (self.size() > 0) and (other.size() > 0):
+        if (size > 0) and (other.size() > 0):
             for attr in ["is_cat_inclusive", "is_categorised"]:
                 a, b = getattr(self, attr), getattr(other, attr)
                 if a != b:
@@ -326,28 +1406,13 @@ class TrackRun:
                         setattr(self.conf, field, None)
         self.sources.extend(other.sources)
 
-        new_data = pd.concat([self.data, other.data], sort=False)
-        new_track_idx = new_data.index.get_level_values(0).to_series()
-        new_track_idx = new_track_idx.ne(new_track_idx.shift()).cumsum() - 1
-
-        mux = pd.MultiIndex.from_arrays(
-            [new_track_idx, new_data.index.get_level_values(1)], names=new_data.index.names
-        )
-        self.data = new_data.set_index(mux)
-
-        # Concatenate categories
-        if (self.cats is not None) or (other.cats is not None):
-            new_cats = pd.concat([self.cats, other.cats], sort=False).fillna(False)
-            new_track_idx = new_cats.index.get_level_values(0).to_series()
-            new_track_idx = new_track_idx.ne(new_track_idx.shift()).cumsum() - 1
-
-            ix = pd.Index(new_track_idx, name=new_cats.index.name)
-            self.cats = new_cats.set_index(ix)
-
     def time_slice(self, start=None, end=None):
         """
         Subset TrackRun by time using pandas boolean indexing.
 
+        Only data are sliced: categories of all tracks are kept, including the tracks
+        outside the time range. Sizes of subsets count only the remaining tracks.
+
         Parameters
         ----------
         start: str or datetime.datetime, optional
@@ -367,6 +1432,20 @@ class TrackRun:
         """
         if (start is None) and (end is None):
             return self
+        elif self._data is None and self._archive is not None:
+            # Query the archive instead of reading all of it
+            where = []
+            if start is not None:
+                where.append(f"time >= '{pd.Timestamp(start)}'")
+            if end is not None:
+                where.append(f"time <= '{pd.Timestamp(end)}'")
+            result = self.__class__()
+            for attr in ["is_categorised", "is_cat_inclusive", "tstep_h", "_cat_sep"]:
+                setattr(result, attr, getattr(self, attr, None))
+            result.conf = None if self.conf is None else self.conf.copy()
+            result.cats = None if self.cats is None else self.cats.copy()
+            result.columns = self.columns
+            result.data = self._archive.read(where=" & ".join(where))
         else:
             crit = True
             if start is not None:
@@ -378,18 +1457,75 @@ class TrackRun:
             result.extend(self)
             # Replace data with TrackRun.data sliced by start or end
             result.data = result.data[crit]
-            # Clear up sources to avoid confusion
-            result.sources = []
-            result.dirname = None
-            result.filelist = []
-            try:
-                result.conf.dt_start = None
-                result.conf.dt_end = None
-            except AttributeError:
-                pass
-            return result
+        # Clear up sources to avoid confusion
+        result.sources = []
+        result.dirname = None
+        result.filelist = []
+        try:
+            result.conf.dt_start = None
+            result.conf.dt_end = None
+        except AttributeError:
+            pass
+        return result
+
+    def track_stats(self, subset=None, r_planet=EARTH_RADIUS):
+        """
+        Calculate properties of all tracks at once.
+
+        The properties are the same as those of `octant.parts.OctantTrack`:
+        `lifetime_h`, `gen_lys_dist_km`, `total_dist_km`, `average_speed` and
+        `max_vort` (if vorticity is present in the data).
+
+        Parameters
+        ----------
+        subset: str, optional
+            Subset of tracks
+        r_planet: float, optional
+            Radius of the planet in metres
+            Default: EARTH_RADIUS
+
+        Returns
+        -------
+        stats: pandas.DataFrame
+            Table of track properties indexed by track index
+
+        Examples
+        --------
+        >>> tr = TrackRun(path_to_directory_with_tracks)
+        >>> stats = tr.track_stats()
+        >>> stats.columns.tolist()
+        ['lifetime_h', 'gen_lys_dist_km', 'total_dist_km', 'average_speed', 'max_vort']
+        >>> (stats.lifetime_h >= 6).sum()
+        31
+        """
+        cols = self.as_columns(subset)
+        stats = pd.DataFrame(index=pd.Index(cols.track_ids, name=self._mux_names[0]))
+        if len(cols) == 0:
+            for name in _TRACK_STATS:
+                stats[name] = np.array([], dtype="double")
+            return stats
+        lon, lat, time = cols.coord_view
+        starts, ends = cols.track_offsets[:-1], cols.track_offsets[1:] - 1
+
+        stats["lifetime_h"] = (time[ends] - time[starts]) / (HOUR / np.timedelta64(1, "ns"))
+        stats["gen_lys_dist_km"] = (
+            great_circle_arr(lon[starts], lon[ends], lat[starts], lat[ends], r_planet=r_planet).base
+            * M2KM
+        )
+        # Distances between consecutive points, excluding steps between different tracks
+        steps = np.zeros_like(lon)
+        steps[1:] = great_circle_arr(lon[:-1], lon[1:], lat[:-1], lat[1:], r_planet=r_planet)
+        steps[starts] = 0.0
+        stats["total_dist_km"] = np.add.reduceat(steps, starts) * M2KM
+        with np.errstate(divide="ignore", invalid="ignore"):
+            stats["average_speed"] = np.where(
+                stats.lifetime_h == 0, np.nan, stats.total_dist_km / stats.lifetime_h
+            )
+        if "vo" in cols.columns:
+            stats["max_vort"] = cols.reduceat(np.fmax, "vo")
+        return stats
 
-    def classify(self, conditions, inclusive=False, clear=True):
+    def classify(self, conditions, inclusive=False, clear=True, n_workers=None):
         """
         Categorise the loaded tracks.
 
@@ -398,6 +1534,10 @@ class TrackRun:
         conditions: list
             List of tuples. Each tuple is a (label, list) pair containing the category label and
             a list of functions each of which has OctantTrack as its only argument.
+            Instead of a function, a string rule can be given, which is evaluated for
+            all tracks at once using the properties from `TrackRun.track_stats()`.
+            Rules are of the form "metric op value", where op is one of <, <=, >, >=, ==, !=,
+            or "metric pct q" to select tracks at or above the q-th percentile of the metric.
             The method assigns numbers to the labels in the same order
             that they are given, starting from number 1 (see examples).
         inclusive: bool, optional
@@ -405,6 +1545,11 @@ class TrackRun:
             otherwise categories are independent.
         clear: bool, optional
             If true, existing TrackRun categories are deleted.
+        n_workers: int, optional
+            If greater than 1, functions are evaluated in this number of processes, each
+            processing a part of the tracks. Functions should be picklable, e.g. module-level
+            functions or `functools.partial` objects; arrays and DataArrays among the arguments
+            of the latter are sent to the processes via shared memory.
 
         Examples
         --------
@@ -424,6 +1569,21 @@ class TrackRun:
         >>> tr.size('category_a'), tr.size('category_b')
         31, 10
 
+        The same using rules where possible
+
+        >>> conds = [
+            ('category_a', ['lifetime_h >= 6']),
+            ('category_b', [myfun, 'gen_lys_dist_km > 300'])
+        ]
+        >>> tr.classify(conds)
+
+        Expensive checks in parallel
+
+        >>> from functools import partial
+        >>> from octant.misc import check_by_mask
+        >>> conds = [('pmc', [partial(check_by_mask, trackrun=tr, lsm=land_mask, dist=50)])]
+        >>> tr.classify(conds, n_workers=4)
+
         For more examples, see example notebooks.
 
         See Also
@@ -449,33 +1609,65 @@ class TrackRun:
                 lab = label
             cond_with_new_labels.append((lab, funcs))
 
-        self.cats = pd.concat(
-            [
-                self.cats,
-                pd.DataFrame(
-                    index=self.data.index.get_level_values(0).unique(),
-                    columns=[cond[0] for cond in cond_with_new_labels],
-                ).fillna(False),
-            ],
-            axis="columns",
-        )
-
-        for i, ot in self._pbar(self.gb):
-            prev_flag = True
-            for label, funcs in cond_with_new_labels:
-                if self.is_cat_inclusive:
-                    _flag = prev_flag
+        # Evaluate rules for all tracks at once and functions for each track in one pass
+        stats = None
+        if any(isinstance(func, str) for _, funcs in conditions for func in funcs):
+            stats = self.track_stats()
+        cols = self.as_columns()
+        flags = np.ones((len(cols), len(conditions)), dtype=bool)
+        callables = []
+        for icond, (_, funcs) in enumerate(conditions):
+            for func in funcs:
+                if isinstance(func, str):
+                    flags[:, icond] &= _eval_rule(func, stats)
                 else:
-                    _flag = True
-
-                for func in funcs:
-                    _flag &= func(ot)
-                if _flag:
-                    self.cats.loc[i, label] = True
-                if self.is_cat_inclusive:
-                    prev_flag = _flag
+                    callables.append((icond, func))
+        if len(callables) > 0 and n_workers is not None and n_workers > 1:
+            res = self._classify_parallel([f for _, f in callables], n_workers)
+            for j, (icond, _) in enumerate(callables):
+                flags[:, icond] &= res[:, j]
+        elif len(callables) > 0:
+            for k, (_, ot) in enumerate(self._pbar(self.gb)):
+                for icond, func in callables:
+                    flags[k, icond] &= bool(func(ot))
+        if self.is_cat_inclusive:
+            flags = np.logical_and.accumulate(flags, axis=1)
+
+        new_cats = pd.DataFrame(
+            flags,
+            index=pd.Index(cols.track_ids, name=self._mux_names[0]),
+            columns=[cond[0] for cond in cond_with_new_labels],
+        )
+        self.cats = pd.concat([self.cats, new_cats], axis="columns")
         self.is_categorised = True
 
+    def _classify_parallel(self, funcs, n_workers):
+        """Evaluate functions for each track in a pool of processes."""
+        df = self.data
+        track_idx = df.index.get_level_values(0).values
+        if not (np.diff(track_idx) >= 0).all():
+            df = df.iloc[np.argsort(track_idx, kind="stable")]
+        # Split tracks into several shards per worker to balance the load
+        offsets = self.as_columns().track_offsets
+        bounds = np.linspace(0, offsets.shape[0] - 1, min(4 * n_workers, len(self)) + 1)
+        bounds = offsets[np.unique(bounds.astype(int))]
+        shards = [df.iloc[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+        shared = []
+        try:
+            shared_funcs = [_share_args(func, shared) for func in funcs]
+            with ProcessPoolExecutor(
+                max_workers=n_workers, initializer=_classify_init, initargs=(shared_funcs,)
+            ) as executor:
+                results = list(self._pbar(executor.map(_classify_shard, shards), total=len(shards)))
+        finally:
+            for ref in shared:
+                try:
+                    ref.release()
+                except OSError:
+                    pass
+        return np.concatenate(results) if len(results) > 0 else np.ones((0, len(funcs)), bool)
+
     def categorise(self, *args, **kwargs):
         """Alias for classify()."""
         return self.classify(*args, **kwargs)
@@ -546,12 +1738,16 @@ class TrackRun:
             by_label, func = by
         label = f"{by_label}__{oper}__{perc}pc" + label
 
-        v_per_track = self[subset].gb.apply(func)
+        if isinstance(by, str) and by in _TRACK_STATS:
+            # Calculate standard properties for all tracks at once
+            v_per_track = self.track_stats(subset)[by]
+        else:
+            v_per_track = self[subset].gb.apply(func)
         if len(v_per_track) > 0:
             # If this subset is not empty, create a new column in categories
             new_col = pd.DataFrame(
-                index=self.data.index.get_level_values(0).unique(), columns=[label]
-            ).fillna(False)
+                False, index=self.data.index.get_level_values(0).unique(), columns=[label]
+            )
             # Find numerical threshold with the given percentage
             thresh = np.percentile(v_per_track, perc)
             # Find all tracks above it
@@ -626,6 +1822,8 @@ class TrackRun:
         time_frac=0.5,
         return_dist_matrix=False,
         beta=100.0,
+        prefilter_time=True,
+        prefilter_bbox=False,
         r_planet=EARTH_RADIUS,
     ):
         """
@@ -654,6 +1852,13 @@ class TrackRun:
         beta: float, optional
             Parameter used in 'bs2000' method
             E.g. beta=100 corresponds to 10 m/s average steering wind
+        prefilter_time: bool, optional
+            Used in 'intersection' and 'simple' methods. If True (default), only
+            pairs of vortices overlapping in time are compared.
+        prefilter_bbox: bool, optional
+            Used in 'intersection' and 'simple' methods. If True, only pairs of
+            vortices with lon-lat bounding boxes within `thresh_dist` are compared.
+            Longitudes of both sets of vortices should be in the same range.
         r_planet: float, optional
             Radius of the planet in metres
             Default: EARTH_RADIUS
@@ -680,6 +1885,8 @@ class TrackRun:
                         time_frac=time_frac,
                         return_dist_matrix=return_dist_matrix,
                         beta=beta,
+                        prefilter_time=prefilter_time,
+                        prefilter_bbox=prefilter_bbox,
                         r_planet=r_planet,
                     )
                 return result
@@ -687,25 +1894,45 @@ class TrackRun:
                 subset = "all"
 
         # Select subset
-        sub_gb = self[subset].gb
+        sub_df = self[subset]
+        sub_gb = sub_df.gb
         if len(sub_gb) == 0 or len(others) == 0:
             return []
         if isinstance(others, list):
             # match against a list of DataFrames of tracks
-            other_gb = pd.concat(
+            other_df = pd.concat(
                 [OctantTrack.from_df(df) for df in others],
                 keys=range(len(others)),
                 names=self._mux_names,
-            ).gb
+            )
         elif isinstance(others, self.__class__):
             # match against another TrackRun
-            other_gb = others[subset].gb
+            other_df = others[subset]
         else:
             raise ArgumentError('Argument "others" ' f"has a wrong type: {type(others)}")
+        other_gb = other_df.gb
         match_pairs = []
+        if method in ["intersection", "simple"]:
+            # Select only pairs of vortices that can match
+            if prefilter_bbox:
+                bbox_dist = thresh_dist * KM2M
+            else:
+                bbox_dist = None
+            if method == "intersection":
+                candidates = _match_candidates(
+                    sub_df, other_df, prefilter_time, bbox_dist, r_planet=r_planet
+                )
+                other_tracks = dict(iter(other_gb))
+            else:
+                candidates = _match_candidates(
+                    other_df, sub_df, prefilter_time, bbox_dist, r_planet=r_planet
+                )
+                sub_tracks = dict(iter(sub_gb))
+
         if method == "intersection":
             for idx, ot in self._pbar(sub_gb):  # , desc="self tracks"):
-                for other_idx, other_ot in self._pbar(other_gb, leave=False):
+                for other_idx in self._pbar(candidates[idx], leave=False):
+                    other_ot = other_tracks[other_idx]
                     times = other_ot.time.values
                     time_match_thresh = time_frac * (times[-1] - times[0]) / HOUR
 
@@ -728,8 +1955,9 @@ class TrackRun:
             ll = ["lon", "lat"]
             match_pairs = []
             for other_idx, other_ct in self._pbar(other_gb):  # , desc="other tracks"):
-                candidates = []
-                for idx, ct in self._pbar(sub_gb, leave=False):  # , desc="self tracks"):
+                candidates_ = []
+                for idx in self._pbar(candidates[other_idx], leave=False):  # , desc="self tracks"):
+                    ct = sub_tracks[idx]
                     if interpolate_to == "other":
                         df1, df2 = ct.copy(), other_ct
                     elif interpolate_to == "self":
@@ -767,30 +1995,32 @@ class TrackRun:
                         # if within_r_idx.any():
                         #     if (new_df1[within_r_idx].index[-1]
                         #        - new_df1[within_r_idx].index[0]) > thr:
-                        #         candidates.append((idx, within_r_idx.sum()))
+                        #         candidates_.append((idx, within_r_idx.sum()))
                         if within_r_idx.sum() > thr:
-                            candidates.append((idx, within_r_idx.sum()))
-                if len(candidates) > 0:
-                    candidates = sorted(candidates, key=lambda x: x[1])
-                    final_idx = candidates[-1][0]
+                            candidates_.append((idx, within_r_idx.sum()))
+                if len(candidates_) > 0:
+                    candidates_ = sorted(candidates_, key=lambda x: x[1])
+                    final_idx = candidates_[-1][0]
                     match_pairs.append((final_idx, other_idx))
 
         elif method == "bs2000":
-            # sub_list = [i[0] for i in list(sub_gb)]
-            sub_indices = list(sub_gb.indices.keys())
-            other_indices = list(other_gb.indices.keys())
-            dist_matrix = np.full((len(sub_gb), len(other_gb)), FILLVAL)
-            for i, (_, ct) in enumerate(self._pbar(sub_gb, leave=False)):  # , desc="self tracks"):
-                x1, y1, t1 = ct.coord_view
-                for j, (_, other_ct) in enumerate(self._pbar(other_gb, leave=False)):
-                    x2, y2, t2 = other_ct.coord_view
-                    dist_matrix[i, j] = distance_metric(
-                        x1, y1, t1, x2, y2, t2, beta=float(beta), r_planet=r_planet
-                    )
+            # Pack both sets of tracks and calculate all distances in one go
+            sub_cols = TrackColumns.from_df(sub_df)
+            other_cols = TrackColumns.from_df(other_df)
+            dist_matrix = distance_matrix(
+                *sub_cols.coord_view,
+                sub_cols.track_offsets,
+                *other_cols.coord_view,
+                other_cols.track_offsets,
+                beta=float(beta),
+                r_planet=r_planet,
+                num_threads=RUNTIME.num_threads,
+            ).base
+            # Find mutually closest pairs
+            closest_other = np.nanargmin(dist_matrix, axis=1)
             for i, idx1 in enumerate(np.nanargmin(dist_matrix, axis=0)):
-                for j, idx2 in enumerate(np.nanargmin(dist_matrix, axis=1)):
-                    if i == idx2 and j == idx1:
-                        match_pairs.append((sub_indices[idx1], other_indices[idx2]))
+                if closest_other[idx1] == i:
+                    match_pairs.append((sub_cols.track_ids[idx1], other_cols.track_ids[i]))
             if return_dist_matrix:
                 return match_pairs, dist_matrix
         else:
@@ -801,7 +2031,7 @@ class TrackRun:
     def density(
         self,
         lon1d,
-        lat1d,
+        lat1d=None,
         by="point",
         subset=None,
         method="cell",
@@ -822,10 +2052,10 @@ class TrackRun:
 
         Parameters
         ----------
-        lon1d: numpy.ndarray
-            Longitude points array of shape (M,)
-        lat1d: numpy.ndarray
-            Latitude points array of shape (N,)
+        lon1d: numpy.ndarray or octant.grid.Grid
+            Longitude points array of shape (M,) or a grid object
+        lat1d: numpy.ndarray, optional
+            Latitude points array of shape (N,); not used if `lon1d` is a grid object
         by: str, optional
             Type of cyclone density (point|track|genesis|lysis)
         subset: str, optional
@@ -846,6 +2076,7 @@ class TrackRun:
             and calculates boundaries, arrays of shape (M+1,) and (N+1,) so that the density
             values refer to centre points given.
             If false, the density is calculated between grid points.
+            Not used if `lon1d` is a grid object.
         weight_by_area: bool, optional
             Weight result by area of grid cells.
         r_planet: float, optional
@@ -856,6 +2087,10 @@ class TrackRun:
         -------
         dens: xarray.DataArray
             Array of track density of shape (M, N) with useful metadata in attrs
+
+        Note
+        ----
+        The density kernels run in `octant.RUNTIME.num_threads` OpenMP threads.
         """
         # Recursive call for each of the available categies
         if subset is None:
@@ -880,83 +2115,228 @@ class TrackRun:
                 subset = "all"
 
         # Redefine grid if necessary
-        if grid_centres:
-            # Input arrays are centres of grid cells, so cell boundaries need to be calculated
-            lon = cell_bounds(lon1d)
-            lat = cell_bounds(lat1d)
-            # Prepare coordinates for output
-            xlon = xr.IndexVariable(dims="longitude", data=lon1d, attrs={"units": "degrees_east"})
-            xlat = xr.IndexVariable(dims="latitude", data=lat1d, attrs={"units": "degrees_north"})
+        if isinstance(lon1d, Grid):
+            grid = lon1d
         else:
-            # Input arrays are boundaries of grid cells, so cell centres need to be
-            # calculated for the output
-            lon, lat = lon1d, lat1d
-            # Prepare coordinates for output
-            xlon = xr.IndexVariable(
-                dims="longitude", data=cell_centres(lon1d), attrs={"units": "degrees_east"}
-            )
-            xlat = xr.IndexVariable(
-                dims="latitude", data=cell_centres(lat1d), attrs={"units": "degrees_north"}
-            )
+            grid = Grid.from_coords(lon1d, lat1d, grid_centres=grid_centres)
 
-        # Create 2D mesh
-        lon2d, lat2d = np.meshgrid(lon, lat)
+        data, units = _density_counts(
+            self[subset], grid, by, method, dist, exclude_first, exclude_last, r_planet
+        )
+        return _density_dataarray(
+            data, grid, by, subset, method, units, weight_by_area, r_planet=r_planet
+        )
 
-        # Select subset
-        sub_df = self[subset]
-        # Prepare coordinates for cython
-        lon2d_c = lon2d.astype("double", order="C")
-        lat2d_c = lat2d.astype("double", order="C")
-
-        # Select method
-        if method == "radius":
-            # Convert radius to metres
-            dist_metres = dist * KM2M
-            units = f"per {round(np.pi * dist**2)} km2"
-            if by == "track":
-                cy_func = partial(track_density_rad, dist=dist_metres, r_planet=r_planet)
-            else:
-                cy_func = partial(point_density_rad, dist=dist_metres, r_planet=r_planet)
-        elif method == "cell":
-            # TODO: make this check more flexible
-            if (np.diff(lon2d[0, :]) < 0).any() or (np.diff(lat2d[:, 0]) < 0).any():
-                raise GridError("Grid values must be in an ascending order")
-            units = "1"
-            if by == "track":
-                cy_func = track_density_cell
+    def _density_cell_all(
+        self,
+        grid,
+        subsets,
+        density_types,
+        method="cell",
+        dist=None,
+        exclude_first={"m": 10, "d": 1},
+        exclude_last={"m": 4, "d": 30},
+        weight_by_area=True,
+        r_planet=EARTH_RADIUS,
+    ):
+        """
+        Calculate cell density of several types for several subsets at once.
+
+        Track points are binned only once, and densities of each of the subsets
+        are obtained by weighting the counts with category flags of the tracks.
+        See `TrackRun.density()` for the description of parameters (`dist` is not used).
+
+        Returns
+        -------
+        list
+            Lists of DataArrays for each of the density types, for each of the subsets
+        """
+        lon, lat = grid.bounds
+        if (np.diff(lon) < 0).any() or (np.diff(lat) < 0).any():
+            raise GridError("Grid values must be in an ascending order")
+        for by in density_types:
+            if by not in ["point", "track", "genesis", "lysis"]:
+                raise ArgumentError("`by` should be one of point|track|genesis|lysis")
+
+        cols = self.as_columns()
+        n_cells = (lat.shape[0] - 1) * (lon.shape[0] - 1)
+        if len(cols) > 0:
+            # Cell index of each point, -1 for points outside of the grid
+            plon, plat, ptime = cols.coord_view
+            i = np.searchsorted(lon, plon, side="right") - 1
+            j = np.searchsorted(lat, plat, side="right") - 1
+            with np.errstate(invalid="ignore"):
+                inside = (plon >= lon[0]) & (plon < lon[-1]) & (plat >= lat[0]) & (plat < lat[-1])
+            cell = np.where(inside, j * (lon.shape[0] - 1) + i, -1)
+            track_pos = np.repeat(np.arange(len(cols)), cols.lengths)
+        else:
+            cell = track_pos = np.zeros(0, dtype=int)
+
+        # Cells and tracks of the points counted for each density type
+        counted = {}
+        for by in density_types:
+            if by == "point":
+                pts = np.flatnonzero(cell >= 0)
+            elif by == "track":
+                # Count each track only once in each cell
+                pts = np.flatnonzero(cell >= 0)
+                _, first = np.unique(track_pos[pts] * n_cells + cell[pts], return_index=True)
+                pts = pts[first]
+            elif by == "genesis":
+                pts = cols.track_offsets[:-1]
+                pts = pts[cols.row_idx[pts] == 0]
+                pts = pts[~_same_day(ptime[pts], **exclude_first) & (cell[pts] >= 0)]
+            elif by == "lysis":
+                pts = cols.track_offsets[1:] - 1
+                pts = pts[~_same_day(ptime[pts], **exclude_last) & (cell[pts] >= 0)]
+            counted[by] = (cell[pts], track_pos[pts])
+
+        result = []
+        for subset in subsets:
+            if (subset in [slice(None), None, "all"]) or len(self) == 0:
+                in_subset = np.ones(len(cols), dtype=bool)
             else:
-                cy_func = point_density_cell
-
-        # Convert dataframe columns to C-ordered arrays
-        if by == "point":
-            sub_data = sub_df.lonlat_c
-        elif by == "track":
-            sub_data = sub_df.tridlonlat_c
-        elif by == "genesis":
-            sub_data = (
-                sub_df.gb.filter(_exclude_by_first_day, **exclude_first).xs(0, level="row_idx")
-            ).lonlat_c
-        elif by == "lysis":
-            sub_data = (
-                self[subset].gb.tail(1).gb.filter(_exclude_by_last_day, **exclude_last)
-            ).lonlat_c
+                in_subset = np.isin(cols.track_ids, self._subset_index(subset))
+            dens_list = []
+            for by in density_types:
+                cells, tracks = counted[by]
+                data = np.bincount(cells, weights=in_subset[tracks], minlength=n_cells)
+                data = data.reshape(lat.shape[0] - 1, lon.shape[0] - 1)
+                dens_list.append(
+                    _density_dataarray(
+                        data, grid, by, subset, method, "1", weight_by_area, r_planet=r_planet
+                    )
+                )
+            result.append(dens_list)
+        return result
+
+
+class DensityAccumulator:
+    """
+    Cyclone density accumulated from chunks of tracks.
+
+    Density values of each chunk are added to a running count, so that
+    the whole dataset does not have to be loaded into memory.
+    Each chunk should contain whole tracks, otherwise tracks split between
+    chunks are counted more than once by the `track` density.
+
+    Examples
+    --------
+    >>> from octant.io import PMCTRACKLoader
+    >>> loader = PMCTRACKLoader(path_to_directory_with_tracks)
+    >>> acc = DensityAccumulator(lon1d, lat1d, by="track")
+    >>> for chunk in loader.iter_chunks(chunk_size=1000):
+            acc.add(chunk)
+    >>> dens = acc.result()
+
+    Chunks can also be read from an archive saved with ``format="table"``:
+
+    >>> tr = TrackRun.from_archive(filename, lazy=True)
+    >>> for chunk in tr.iter_chunks(chunk_size=1000):
+            acc.add(chunk)
+
+    See Also
+    --------
+    octant.core.TrackRun.density, octant.io.CSVLoader.iter_chunks,
+    octant.core.TrackRun.iter_chunks
+    """
+
+    def __init__(
+        self,
+        lon1d,
+        lat1d=None,
+        by="point",
+        subset=None,
+        method="cell",
+        dist=222.0,
+        exclude_first={"m": 10, "d": 1},
+        exclude_last={"m": 4, "d": 30},
+        grid_centres=True,
+        weight_by_area=True,
+        r_planet=EARTH_RADIUS,
+    ):
+        """
+        Initialise octant.core.DensityAccumulator.
+
+        Parameters are the same as in `octant.core.TrackRun.density()`.
+        `subset` is only used when chunks are given as TrackRun objects.
+        """
+        if isinstance(lon1d, Grid):
+            self.grid = lon1d
         else:
-            raise ArgumentError("`by` should be one of point|track|genesis|lysis")
+            self.grid = Grid.from_coords(lon1d, lat1d, grid_centres=grid_centres)
+        self.by = by
+        self.subset = "all" if subset is None else subset
+        self.method = method
+        self.dist = dist
+        self.exclude_first = exclude_first
+        self.exclude_last = exclude_last
+        self.weight_by_area = weight_by_area
+        self.r_planet = r_planet
+        self.n_chunks = 0
+        self._count = None
+        self._units = None
+
+    def add(self, chunk):
+        """
+        Add density of a chunk of tracks to the running count.
 
-        data = cy_func(lon2d_c, lat2d_c, sub_data).base
+        Parameters
+        ----------
+        chunk: octant.parts.OctantTrack or octant.core.TrackRun
+            Multi-index DataFrame of tracks or TrackRun
+        """
+        if isinstance(chunk, TrackRun):
+            chunk = chunk[self.subset]
+        data, units = _density_counts(
+            chunk,
+            self.grid,
+            self.by,
+            self.method,
+            self.dist,
+            self.exclude_first,
+            self.exclude_last,
+            self.r_planet,
+        )
+        if self._count is None:
+            self._count, self._units = data, units
+        else:
+            self._count += data
+        self.n_chunks += 1
 
-        if weight_by_area:
-            # calculate area in metres
-            area = grid_cell_areas(xlon.values, xlat.values, r_planet=r_planet)
-            data /= area
-            data *= KM2M * KM2M  # convert to km^{-2}
-            units = "km-2"
+    def result(self):
+        """
+        Get the accumulated density.
 
-        dens = xr.DataArray(
+        Returns
+        -------
+        dens: xarray.DataArray
+            Array of track density with useful metadata in attrs
+        """
+        if self._count is None:
+            # No chunks have been added
+            empty = OctantTrack(
+                columns=["lon", "lat"], index=pd.MultiIndex.from_arrays([[], []], names=MUX_NAMES)
+            )
+            data, units = _density_counts(
+                empty,
+                self.grid,
+                "point",
+                self.method,
+                self.dist,
+                self.exclude_first,
+                self.exclude_last,
+                self.r_planet,
+            )
+        else:
+            data, units = self._count.copy(), self._units
+        return _density_dataarray(
             data,
-            name=f"{by}_density",
-            attrs={"units": units, "subset": subset, "method": method},
-            dims=("latitude", "longitude"),
-            coords={"longitude": xlon, "latitude": xlat},
+            self.grid,
+            self.by,
+            self.subset,
+            self.method,
+            units,
+            self.weight_by_area,
+            r_planet=self.r_planet,
         )
-        return dens
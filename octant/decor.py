@@ -108,7 +108,11 @@ class ReprTrackRun:
         self.trackrun = trackrun
         self.name = f"{self.trackrun.__module__}.{self.trackrun.__class__.__name__}"
         self.n_tracks = len(trackrun)
-        self.data_cols = tuple(trackrun.data.columns)
+        if trackrun._data is None:
+            # Do not construct or read the data just to show the columns
+            self.data_cols = tuple(trackrun.columns)
+        else:
+            self.data_cols = tuple(trackrun.data.columns)
         self.ncol = len(self.data_cols)
         self.longname = "Cyclone tracking results"
 
@@ -191,7 +195,7 @@ class ReprTrackRun:
 
         if len(self.trackrun) > 0:
             summary.append("\nData columns:")
-            summary.append(" | ".join(self.trackrun.data.columns))
+            summary.append(" | ".join(self.data_cols))
 
         if self.trackrun.is_categorised:
             if self.trackrun.is_cat_inclusive:
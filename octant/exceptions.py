@@ -26,6 +26,12 @@ class InconsistencyWarning(OctantWarning):
     pass
 
 
+class MissingDependencyWarning(OctantWarning):
+    """An optional dependency is missing and a slower fallback is used."""
+
+    pass
+
+
 class OctantError(Exception):
     """Base class for errors in octant package."""
 
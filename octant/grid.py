@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 """Operations on geographical grid."""
+from functools import lru_cache
+
 import numpy as np
 
+from .exceptions import GridError
 from .params import EARTH_RADIUS
 
 
@@ -36,7 +39,8 @@ def cell_centres(bounds, bound_position=0.5):
     --------
     octant.grid.cell_bounds
     """
-    assert bounds.ndim == 1, "Only 1D points are allowed"
+    if bounds.ndim != 1:
+        raise GridError("Only 1D points are allowed")
     deltas = np.diff(bounds) * bound_position
     centres = bounds[:-1] + deltas
     return centres
@@ -73,9 +77,11 @@ def cell_bounds(points, bound_position=0.5):
     --------
     octant.grid.cell_centres
     """
-    assert points.ndim == 1, "Only 1D points are allowed"
+    if points.ndim != 1:
+        raise GridError("Only 1D points are allowed")
     diffs = np.diff(points)
-    assert (diffs == diffs[0]).all(), "The function only works for uniformly spaced points"
+    if not (diffs == diffs[0]).all():
+        raise GridError("The function only works for uniformly spaced points")
     delta = diffs[0] * bound_position
     bounds = np.concatenate([[points[0] - delta], points + delta])
     return bounds
@@ -145,3 +151,167 @@ def grid_cell_areas(lon1d, lat1d, r_planet=EARTH_RADIUS):
     lat_bounds_radian = np.deg2rad(_iris_guess_bounds(lat1d))
     area = _quadrant_area(lat_bounds_radian, lon_bounds_radian, r_planet)
     return area
+
+
+def unit_xyz(lon, lat):
+    """
+    Calculate cartesian coordinates of points on a unit sphere.
+
+    Parameters
+    ----------
+    lon, lat: numpy.array
+        Arrays of longitudes and latitudes in degrees
+
+    Returns
+    -------
+    xyz: numpy.array
+        Array of shape (P, 3), where P is the size of `lon` and `lat`
+    """
+    lon, lat = np.deg2rad(np.ravel(lon)), np.deg2rad(np.ravel(lat))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+class Grid:
+    """
+    Longitude-latitude grid with its geometry calculated once.
+
+    Cell boundaries and centres, 2D coordinate arrays, cell areas and cartesian
+    coordinates are calculated on first access and stored as C-ordered arrays of
+    double precision, ready to be passed to functions in `octant.utils`.
+    Arrays are shared between users of the grid and are read-only.
+
+    Use `Grid.from_coords()` to reuse the same object for the same grid definition.
+    """
+
+    def __init__(self, lon1d, lat1d, grid_centres=True):
+        """
+        Initialise octant.grid.Grid.
+
+        Parameters
+        ----------
+        lon1d: numpy.array
+            Longitude points array of shape (M,)
+        lat1d: numpy.array
+            Latitude points array of shape (N,)
+        grid_centres: bool, optional
+            If true, the arrays are centres of grid cells; otherwise, they are cell boundaries.
+        """
+        self.lon1d = np.ascontiguousarray(lon1d, dtype="double")
+        self.lat1d = np.ascontiguousarray(lat1d, dtype="double")
+        if self.lon1d.ndim != 1 or self.lat1d.ndim != 1:
+            raise GridError("Only 1D points are allowed")
+        self.grid_centres = grid_centres
+        self._cache = {}
+
+    @classmethod
+    def from_coords(cls, lon1d, lat1d, grid_centres=True):
+        """
+        Get a grid from the cache of recently used grids or create a new one.
+
+        Parameters
+        ----------
+        lon1d: numpy.array
+            Longitude points array of shape (M,)
+        lat1d: numpy.array
+            Latitude points array of shape (N,)
+        grid_centres: bool, optional
+            If true, the arrays are centres of grid cells; otherwise, they are cell boundaries.
+
+        Returns
+        -------
+        octant.grid.Grid
+        """
+        lon1d = np.ascontiguousarray(lon1d, dtype="double")
+        lat1d = np.ascontiguousarray(lat1d, dtype="double")
+        return _cached_grid(cls, lon1d.tobytes(), lat1d.tobytes(), grid_centres)
+
+    def _cached(self, key, func):
+        if key not in self._cache:
+            value = func()
+            for arr in value if isinstance(value, tuple) else (value,):
+                arr.setflags(write=False)
+            self._cache[key] = value
+        return self._cache[key]
+
+    def __repr__(self):  # noqa
+        return f"Grid(shape={self.shape})"
+
+    @property
+    def bounds(self):
+        """Cell boundaries: longitudes of shape (M+1,) and latitudes of shape (N+1,)."""
+        if not self.grid_centres:
+            return self.lon1d, self.lat1d
+        return self._cached(
+            "bounds",
+            lambda: tuple(
+                np.ascontiguousarray(cell_bounds(arr), dtype="double")
+                for arr in (self.lon1d, self.lat1d)
+            ),
+        )
+
+    @property
+    def centres(self):
+        """Cell centres: longitudes of shape (M,) and latitudes of shape (N,)."""
+        if self.grid_centres:
+            return self.lon1d, self.lat1d
+        return self._cached(
+            "centres",
+            lambda: tuple(
+                np.ascontiguousarray(cell_centres(arr), dtype="double")
+                for arr in (self.lon1d, self.lat1d)
+            ),
+        )
+
+    @property
+    def shape(self):
+        """Shape of the grid of cell centres (N, M)."""
+        lon, lat = self.centres
+        return lat.shape[0], lon.shape[0]
+
+    @property
+    def mesh(self):
+        """2D arrays of longitudes and latitudes of cell centres of shape (N, M)."""
+        return self._cached(
+            "mesh",
+            lambda: tuple(
+                np.ascontiguousarray(arr, dtype="double") for arr in np.meshgrid(*self.centres)
+            ),
+        )
+
+    @property
+    def xyz(self):
+        """Cartesian coordinates of cell centres on a unit sphere, shape (N*M, 3)."""
+        return self._cached("xyz", lambda: unit_xyz(*self.mesh))
+
+    def areas(self, r_planet=EARTH_RADIUS):
+        """
+        Calculate areas of grid cells.
+
+        Parameters
+        ----------
+        r_planet: float, optional
+            Radius of the planet in metres
+            Default: EARTH_RADIUS
+
+        Returns
+        -------
+        area: numpy.array
+            Array of shape (N, M)
+
+        See Also
+        --------
+        octant.grid.grid_cell_areas
+        """
+        return self._cached(("areas", r_planet), lambda: grid_cell_areas(*self.centres, r_planet))
+
+
+@lru_cache(maxsize=32)
+def _cached_grid(cls, lon_bytes, lat_bytes, grid_centres):
+    """Create Grid from binary representation of its coordinates."""
+    lon1d = np.frombuffer(lon_bytes, dtype="double")
+    lat1d = np.frombuffer(lat_bytes, dtype="double")
+    grid = cls(lon1d.copy(), lat1d.copy(), grid_centres=grid_centres)
+    # The same object is returned to all callers, so its arrays are protected from changes
+    grid.lon1d.setflags(write=False)
+    grid.lat1d.setflags(write=False)
+    return grid
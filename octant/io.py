@@ -1,24 +1,153 @@
 # -*- coding: utf-8 -*-
 """Input-output functions."""
+import hashlib
+import os
 from abc import ABC, abstractmethod
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 
+import numpy as np
+
 import pandas as pd
 
+from . import __version__
 from .decor import get_pbar
 from .exceptions import LoadError
 from .params import MUX_NAMES, SCALE_VO
-from .parts import OctantTrack
+from .parts import OctantTrack, TrackColumns
+from .utils import parse_vortrack
 
 ARCH_KEY = "trackrun"
 ARCH_KEY_CAT = ARCH_KEY + "_categories"
+ARCH_KEY_OFFSETS = ARCH_KEY + "_offsets"
+PARQUET_PARTITIONS = ["year", "track_block"]
+MEMMAP_INDEX = ["track_offsets", "track_ids", "row_idx"]
+TIME_PARTS = ["year", "month", "day", "hour", "minute"]
+CACHE_COL_PREFIX = "column__"
+
+
+class HDFTrackReader:
+    """
+    Reader of tracks from an archive saved in HDF5 table format.
+
+    Rows of each track are located by the track offsets stored in the archive,
+    so that subsets of tracks are read without reading the rest of the data.
+    """
+
+    def __init__(self, filename, offsets):
+        """
+        Instantiate HDFTrackReader.
+
+        Parameters
+        ----------
+        filename: str or pathlib.Path
+            File path to HDF5 file
+        offsets: pandas.DataFrame
+            Table of "start" and "stop" rows indexed by track index
+        """
+        self.filename = filename
+        self.track_ids = offsets.index.values
+        self.starts = offsets["start"].values
+        self.stops = offsets["stop"].values
+
+    def __len__(self):
+        """Get the number of tracks."""
+        return self.track_ids.shape[0]
+
+    def read(self, track_ids=None, where=None):
+        """
+        Read tracks from the archive.
+
+        Parameters
+        ----------
+        track_ids: array-like, optional
+            Indices of tracks to read; by default, all tracks are read
+        where: str, optional
+            Query passed to `pandas.HDFStore.select()`, e.g. "time >= '2000-01-01'".
+            If `track_ids` are also given, only rows of these tracks satisfying the query
+            are read.
+
+        Returns
+        -------
+        octant.parts.OctantTrack
+            Multi-index dataframe of tracks
+        """
+        with pd.HDFStore(self.filename, mode="r") as store:
+            if track_ids is None:
+                df = store.select(ARCH_KEY, where=where)
+            else:
+                k = np.flatnonzero(np.isin(self.track_ids, track_ids))
+                lengths = self.stops[k] - self.starts[k]
+                shift = np.repeat(self.starts[k] - np.cumsum(lengths) + lengths, lengths)
+                rows = np.arange(lengths.sum()) + shift
+                if where is not None:
+                    rows = np.intersect1d(
+                        rows, store.select_as_coordinates(ARCH_KEY, where=where)
+                    )
+                if rows.shape[0] == 0:
+                    df = store.select(ARCH_KEY, start=0, stop=0)
+                else:
+                    df = store.select(ARCH_KEY, where=rows)
+        if df.shape[0] > 0:
+            return OctantTrack.from_mux_df(df.set_index(MUX_NAMES))
+        return OctantTrack(
+            columns=df.columns.drop(MUX_NAMES),
+            index=pd.MultiIndex.from_arrays([[], []], names=MUX_NAMES),
+        )
+
+    def iter_chunks(self, chunk_size=1000):
+        """
+        Read tracks from the archive in chunks instead of reading all of them at once.
+
+        Parameters
+        ----------
+        chunk_size: int, optional
+            Number of tracks in each chunk
+
+        Yields
+        ------
+        octant.parts.OctantTrack
+            Multi-index dataframe of whole tracks
+
+        See Also
+        --------
+        octant.core.DensityAccumulator
+        """
+        if len(self) == 0:
+            return
+        for track_ids in np.split(self.track_ids, np.arange(chunk_size, len(self), chunk_size)):
+            yield self.read(track_ids=track_ids)
 
 
 class CSVLoader(ABC):
-    """Abstract base class for reading CSV files with tracking output."""
+    """
+    Abstract base class for reading CSV files with tracking output.
+
+    Subclasses describe the format of the files by the following attributes,
+    and the shared engine reads the files, splits them into tracks and assembles the data.
+
+    Attributes
+    ----------
+    time_parts: list of int, optional
+        Positions of year, month, day, hour and minute columns, which are combined
+        into the "time" column. If None, time is parsed by `pandas.read_csv()`.
+    track_column: str, optional
+        Column with track numbers, if each file contains several tracks.
+        If None, each file contains one track.
+    scale: dict, optional
+        Factors to multiply columns by after reading
+    compact_dtypes: dict, optional
+        Data types of columns used if the loader is created with `downcast=True`
+    """
 
-    def __init__(self, dirname=Path.cwd(), files_wildcard="*"):
+    time_parts = None
+    track_column = None
+    scale = {}
+    compact_dtypes = {}
+
+    def __init__(self, dirname=Path.cwd(), files_wildcard="*", n_workers=None, downcast=False):
         """
         Instantiate base loader.
 
@@ -28,10 +157,17 @@ class CSVLoader(ABC):
             Path to the directory with tracking output.
         files_wildcard: str, optional
             Wildcard to find files in the directory.
+        n_workers: int, optional
+            If greater than 1, files are parsed in this number of processes.
+        downcast: bool, optional
+            Convert columns to `compact_dtypes`, e.g. single-precision coordinates,
+            to reduce memory footprint.
         """
         if not dirname.is_dir():
             raise LoadError(f"No such directory: {dirname}")
         self.filelist = sorted(dirname.glob(files_wildcard))
+        self.n_workers = n_workers
+        self.downcast = downcast
 
     @property
     @abstractmethod
@@ -39,10 +175,216 @@ class CSVLoader(ABC):
         """Reserve property for read_csv() keywords."""
         return None
 
-    @abstractmethod
+    def _read_file(self, fname):
+        """Read a file into a dictionary of numpy arrays, with time parsed and columns scaled."""
+        df = pd.read_csv(fname, **self.read_csv_kw)
+        columns = {}
+        if self.time_parts is not None:
+            parts = df.columns[self.time_parts]
+            columns["time"] = pd.to_datetime(
+                pd.DataFrame({k: df[c].values for k, c in zip(TIME_PARTS, parts)})
+            ).values
+            df = df.drop(columns=parts)
+        columns.update({k: df[k].values for k in df.columns})
+        for k, factor in self.scale.items():
+            if k in columns:
+                columns[k] = columns[k] * factor
+        return columns
+
+    def _load_file(self, fname):
+        """
+        Read a file into columns sorted by track.
+
+        Returns
+        -------
+        columns: dict
+            Dictionary of numpy arrays
+        lengths: numpy.ndarray
+            Number of points in each track
+        """
+        columns = self._read_file(fname)
+        if self.track_column is None:
+            lengths = np.array([len(next(iter(columns.values()), []))])
+        else:
+            codes, uniques = pd.factorize(columns[self.track_column], sort=True)
+            order = np.argsort(codes, kind="stable")
+            columns = {k: v[order] for k, v in columns.items()}
+            lengths = np.bincount(codes, minlength=uniques.shape[0])
+        if self.downcast:
+            columns = {
+                k: v.astype(self.compact_dtypes[k]) if k in self.compact_dtypes else v
+                for k, v in columns.items()
+            }
+        return columns, lengths
+
+    def _iter_files(self):
+        """Load files, in several processes if `n_workers` is greater than 1."""
+        if self.n_workers is not None and self.n_workers > 1:
+            with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+                yield from self._pbar(
+                    self._iter_futures(executor, 2 * self.n_workers), total=len(self.filelist)
+                )
+        else:
+            for fname in self._pbar(self.filelist):
+                yield self._load_file(fname)
+
+    def _iter_futures(self, executor, window):
+        """
+        Load files in an executor, keeping at most `window` files submitted but not yielded.
+
+        Unlike `executor.map()`, which submits all files at once, this keeps only a few
+        parsed files in memory when results are consumed slower than they are produced.
+        """
+        fnames = iter(self.filelist)
+        pending = deque(executor.submit(self._load_file, fname) for fname in islice(fnames, window))
+        while len(pending) > 0:
+            result = pending.popleft().result()
+            for fname in islice(fnames, 1):
+                pending.append(executor.submit(self._load_file, fname))
+            yield result
+
     def __call__(self):
-        """Reserve method for reading data."""
-        pass
+        """Read files and assemble them into a `TrackRun.data`-like dataframe."""
+        if len(self.filelist) == 0:
+            raise LoadError("No files to load")
+        blocks = list(self._iter_files())
+        lengths = np.concatenate([block[1] for block in blocks])
+        columns = {k: np.concatenate([block[0][k] for block in blocks]) for k in blocks[0][0]}
+        del blocks
+        return OctantTrack(columns, index=_track_mux(lengths))
+
+    def _collate(self, blocks, start=0):
+        """
+        Concatenate blocks of columns of a chunk into a `TrackRun.data`-like dataframe.
+
+        Parameters
+        ----------
+        blocks: list
+            Pairs of dictionaries of column arrays and track lengths, see `_load_file()`
+        start: int, optional
+            Index of the first track
+        """
+        lengths = np.concatenate([block[1] for block in blocks])
+        columns = {k: np.concatenate([block[0][k] for block in blocks]) for k in blocks[0][0]}
+        return OctantTrack(columns, index=_track_mux(lengths, start=start))
+
+    def iter_chunks(self, chunk_size=1000):
+        """
+        Read tracks in chunks instead of loading all of them at once.
+
+        Track indices are the same as in the dataframe returned by calling the loader.
+
+        Parameters
+        ----------
+        chunk_size: int, optional
+            Number of tracks in each chunk
+
+        Yields
+        ------
+        octant.parts.OctantTrack
+            Multi-index dataframe of whole tracks
+
+        See Also
+        --------
+        octant.core.DensityAccumulator
+        """
+        chunk = []
+        n_tracks = start = 0
+        for columns, lengths in self._iter_files():
+            offsets = np.concatenate([[0], np.cumsum(lengths)])
+            i = 0
+            while i < lengths.shape[0]:
+                # Take as many tracks of the file as fit in the current chunk
+                j = min(i + chunk_size - n_tracks, lengths.shape[0])
+                a, b = offsets[i], offsets[j]
+                chunk.append(({k: v[a:b] for k, v in columns.items()}, lengths[i:j]))
+                n_tracks += j - i
+                i = j
+                if n_tracks == chunk_size:
+                    yield self._collate(chunk, start=start)
+                    start += n_tracks
+                    chunk = []
+                    n_tracks = 0
+        if len(chunk) > 0:
+            yield self._collate(chunk, start=start)
+
+    def cache_key(self):
+        """
+        Get a key identifying the result of the loader.
+
+        The key is a hash of the loader class, octant version, and names, sizes and
+        modification times of the files.
+
+        Returns
+        -------
+        str
+        """
+        key = hashlib.sha1()
+        key.update(f"{type(self).__module__}.{type(self).__qualname__}".encode())
+        key.update(__version__.encode())
+        key.update(f"downcast={self.downcast}".encode())
+        for fname in self.filelist:
+            stat = fname.stat()
+            key.update(f"{fname.resolve()}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return key.hexdigest()
+
+    def _cache_file(self, cache_dir):
+        """Get path to the cache file."""
+        return Path(cache_dir) / f"{type(self).__name__}_{self.cache_key()}.npz"
+
+    def read_cache(self, cache_dir):
+        """
+        Read the result of the loader cached in a directory.
+
+        Parameters
+        ----------
+        cache_dir: pathlib.Path
+            Directory with cache files
+
+        Returns
+        -------
+        octant.parts.TrackColumns or None
+            Columns of tracking data, or None if the cache file does not exist
+        """
+        fname = self._cache_file(cache_dir)
+        if not fname.is_file():
+            return None
+        n = len(CACHE_COL_PREFIX)
+        with np.load(fname) as npz:
+            columns = {k[n:]: npz[k] for k in npz.files if k.startswith(CACHE_COL_PREFIX)}
+            return TrackColumns(
+                columns, npz["track_offsets"], track_ids=npz["track_ids"], row_idx=npz["row_idx"]
+            )
+
+    def write_cache(self, cache_dir, columns):
+        """
+        Write the result of the loader to a cache directory.
+
+        Columns of object data type (e.g. strings) cannot be read back without pickling,
+        so nothing is cached if there are any.
+
+        Parameters
+        ----------
+        cache_dir: pathlib.Path
+            Directory with cache files; created if it does not exist
+        columns: octant.parts.TrackColumns
+            Columns of tracking data
+        """
+        if any(v.dtype.hasobject for v in columns.columns.values()):
+            return
+        fname = self._cache_file(cache_dir)
+        fname.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {f"{CACHE_COL_PREFIX}{k}": v for k, v in columns.columns.items()}
+        tmp_fname = fname.with_name(f"{fname.stem}.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp_fname,
+            track_offsets=columns.track_offsets,
+            track_ids=columns.track_ids,
+            row_idx=columns.row_idx,
+            **arrays,
+        )
+        # Replace atomically, so that a partially written file is never read
+        os.replace(tmp_fname, fname)
 
     @property
     def _pbar(self):
@@ -50,10 +392,61 @@ class CSVLoader(ABC):
         return get_pbar()
 
 
+def _parse_vortrack(fname, names, scale):
+    """Read a PMCTRACK vortrack file into a dictionary of numpy arrays using the native parser."""
+    values, time = parse_vortrack(Path(fname).read_bytes(), len(names), names.index("time"))
+    columns = {}
+    for i, name in enumerate(names):
+        if name == "time":
+            columns[name] = time.view("datetime64[ns]")
+        elif name == "vortex_type":
+            columns[name] = values[:, i].astype("int64")
+        elif name in scale:
+            columns[name] = values[:, i] * scale[name]
+        else:
+            columns[name] = values[:, i].copy()
+    return columns
+
+
+def _track_mux(lengths, start=0):
+    """
+    Build the (track_idx, row_idx) multi-index from integer codes given track lengths.
+
+    Tracks are numbered from `start`.
+    """
+    n_tracks = lengths.shape[0]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    track_idx = np.repeat(np.arange(n_tracks), lengths)
+    row_idx = np.arange(offsets[-1]) - np.repeat(offsets[:-1], lengths)
+    return pd.MultiIndex(
+        levels=[np.arange(start, start + n_tracks), np.arange(max(lengths.max(initial=0), 1))],
+        codes=[track_idx, row_idx],
+        names=MUX_NAMES,
+    )
+
+
 class PMCTRACKLoader(CSVLoader):
     """Loader of PMCTRACK output."""
 
-    def __init__(self, dirname=Path.cwd(), files_wildcard="vortrack*0001.txt"):
+    # Scale vorticity to (s-1)
+    scale = {"vo": SCALE_VO}
+    compact_dtypes = {
+        "lon": "float32",
+        "lat": "float32",
+        "vo": "float32",
+        "area": "float32",
+        "vortex_type": "int8",
+        "slp": "float32",
+    }
+
+    def __init__(
+        self,
+        dirname=Path.cwd(),
+        files_wildcard="vortrack*0001.txt",
+        n_workers=None,
+        downcast=False,
+        engine="pandas",
+    ):
         """
         Instantiate PMCTRACK loader with a different default wildcard.
 
@@ -65,8 +458,23 @@ class PMCTRACKLoader(CSVLoader):
             Wildcard to find files in the directory.
             By default, loads only "primary" vortices and skips merged.
             See PMCTRACK docs for more info.
+        n_workers: int, optional
+            If greater than 1, files are parsed in this number of processes.
+        downcast: bool, optional
+            Store coordinates, vorticity, area and SLP in single precision
+            and vortex type as int8.
+        engine: str, optional
+            Parser to use:
+             - "pandas": `pandas.read_csv()` with `read_csv_kw`
+             - "native": compiled parser of the fixed vortrack format, which converts
+               times directly to `datetime64[ns]` and scales vorticity while parsing
         """
-        super(PMCTRACKLoader, self).__init__(dirname=dirname, files_wildcard=files_wildcard)
+        super(PMCTRACKLoader, self).__init__(
+            dirname=dirname, files_wildcard=files_wildcard, n_workers=n_workers, downcast=downcast
+        )
+        if engine not in ("pandas", "native"):
+            raise LoadError(f"Unknown engine: {engine}")
+        self.engine = engine
 
     @property
     def read_csv_kw(self):
@@ -77,18 +485,11 @@ class PMCTRACKLoader(CSVLoader):
             "parse_dates": ["time"],
         }
 
-    def __call__(self):
-        """Read CSV files and collate them into a `TrackRun.data`-like dataframe."""
-        _data = []
-        for fname in self._pbar(self.filelist):
-            _data.append(OctantTrack.from_df(pd.read_csv(fname, **self.read_csv_kw)))
-        if len(_data) > 0:
-            result = pd.concat(_data, keys=range(len(_data)), names=MUX_NAMES)
-            if "vo" in result.columns:
-                # Scale vorticity to (s-1)
-                result["vo"] *= SCALE_VO
-        del _data
-        return result
+    def _read_file(self, fname):
+        """Read a file into a dictionary of numpy arrays, using the selected engine."""
+        if self.engine == "native":
+            return _parse_vortrack(fname, self.read_csv_kw["names"], self.scale)
+        return super(PMCTRACKLoader, self)._read_file(fname)
 
 
 class PMCTRACKLoaderWithSLP(PMCTRACKLoader):
@@ -107,25 +508,15 @@ class PMCTRACKLoaderWithSLP(PMCTRACKLoader):
 class STARSLoader(CSVLoader):
     """Loader of STARS database."""
 
+    time_parts = [1, 2, 3, 4, 5]
+    track_column = "N"
+    compact_dtypes = {"N": "int32", "Lat": "float32", "Lon": "float32"}
+
     @property
     def read_csv_kw(self):
         """Keyword arguments for `pandas.read_csv()`."""
         return {
             "delimiter": r"\s+",
-            "parse_dates": {"time": [1, 2, 3, 4, 5]},
-            "date_parser": lambda *x: datetime.strptime(" ".join(x), "%Y %m %d %H %M"),
-            "dtype": {k: v for k, v in enumerate((int,) + 5 * (str,) + 4 * (float,))},
+            "dtype": {k: v for k, v in enumerate(6 * (int,) + 4 * (float,))},
             "skiprows": 5,
         }
-
-    def __call__(self):
-        """Read CSV files and collate them into a `TrackRun.data`-like dataframe."""
-        _data = []
-        for fname in self._pbar(self.filelist):
-            df = pd.read_csv(fname, **self.read_csv_kw)
-            for _, track in df.groupby("N"):
-                _data.append(OctantTrack.from_df(track))
-        if len(_data) > 0:
-            result = pd.concat(_data, keys=range(len(_data)), names=MUX_NAMES)
-        del _data
-        return result
@@ -1,40 +1,45 @@
 # -*- coding: utf-8 -*-
 """Miscellanea."""
 import operator
+import warnings
 from collections.abc import Iterable
 
 import numpy as np
 
+import pandas as pd
+
 import xarray as xr
 
+from . import RUNTIME
 from .decor import get_pbar
-from .exceptions import ArgumentError
+from .exceptions import ArgumentError, MissingDependencyWarning
+from .grid import Grid, unit_xyz
 from .params import EARTH_RADIUS, KM2M
-from .utils import great_circle, mask_tracks, mean_arr_along_track
+from .utils import great_circle, great_circle_arr, mask_tracks, mean_arr_along_track
 
 DENSITY_TYPES = ["point", "track", "genesis", "lysis"]
 
 
 def _exclude_by_first_day(df, m, d):
     """Check if OctantTrack starts on certain day and month."""
-    return not ((df.time.dt.month[0] == m).any() and (df.time.dt.day[0] == d).any())
+    return not ((df.time.dt.month.iloc[0] == m) and (df.time.dt.day.iloc[0] == d))
 
 
 def _exclude_by_last_day(df, m, d):
     """Check if OctantTrack ends on certain day and month."""
-    return not ((df.time.dt.month[-1] == m).any() and (df.time.dt.day[-1] == d).any())
+    return not ((df.time.dt.month.iloc[-1] == m) and (df.time.dt.day.iloc[-1] == d))
 
 
-def calc_all_dens(tr_obj, lon2d, lat2d, subsets=None, density_types=DENSITY_TYPES, **kwargs):
+def calc_all_dens(tr_obj, lon2d, lat2d=None, subsets=None, density_types=DENSITY_TYPES, **kwargs):
     """
     Calculate all types of cyclone density for subsets of TrackRun.
 
     Parameters
     ----------
-    lon2d: numpy.ndarray
-        2D array of longitudes
-    lat2d: numpy.ndarray
-        2D array of latitudes
+    lon2d: numpy.ndarray or octant.grid.Grid
+        Array of longitudes or a grid object
+    lat2d: numpy.ndarray, optional
+        Array of latitudes; not used if `lon2d` is a grid object
     subsets: list, optional
         Subsets of `TrackRun` to process. By default, all subsets are processed.
     density_types: list, optional
@@ -42,6 +47,7 @@ def calc_all_dens(tr_obj, lon2d, lat2d, subsets=None, density_types=DENSITY_TYPE
     **kwargs: dict
         Keyword arguments passed to `octant.core.TrackRun.density()`.
         Should not include `subset` and `by` keywords, because they are passed separately.
+        `grid_centres` is not used if `lon2d` is a grid object.
 
     Returns
     -------
@@ -54,6 +60,13 @@ def calc_all_dens(tr_obj, lon2d, lat2d, subsets=None, density_types=DENSITY_TYPE
     """
     pbar = get_pbar()
 
+    # Grid geometry is calculated only once for all densities
+    grid_centres = kwargs.pop("grid_centres", True)
+    if isinstance(lon2d, Grid):
+        grid = lon2d
+    else:
+        grid = Grid.from_coords(lon2d, lat2d, grid_centres=grid_centres)
+
     if subsets is None:
         if tr_obj.is_categorised:
             subsets = tr_obj.cat_labels
@@ -65,12 +78,17 @@ def calc_all_dens(tr_obj, lon2d, lat2d, subsets=None, density_types=DENSITY_TYPE
 
     subset_dim = xr.DataArray(name="subset", dims=("subset"), data=subsets)
     dens_dim = xr.DataArray(name="dens_type", dims=("dens_type"), data=density_types)
-    list1 = []
-    for subset in pbar(subsets):  # , desc="subsets"):
-        list2 = []
-        for by in pbar(density_types):  # , desc="density_types"):
-            list2.append(tr_obj.density(lon2d, lat2d, by=by, subset=subset, **kwargs))
-        list1.append(xr.concat(list2, dim=dens_dim))
+    if kwargs.get("method", "cell") == "cell":
+        # Bin track points once for all subsets and density types
+        dens_all = tr_obj._density_cell_all(grid, subsets, density_types, **kwargs)
+        list1 = [xr.concat(list2, dim=dens_dim) for list2 in dens_all]
+    else:
+        list1 = []
+        for subset in pbar(subsets):  # , desc="subsets"):
+            list2 = []
+            for by in pbar(density_types):  # , desc="density_types"):
+                list2.append(tr_obj.density(grid, by=by, subset=subset, **kwargs))
+            list1.append(xr.concat(list2, dim=dens_dim))
     da = xr.concat(list1, dim=subset_dim)
     return da.rename("density")
 
@@ -94,31 +112,152 @@ def bin_count_tracks(tr_obj, start_year, n_winters, by="M"):
         Binned counts of shape (N,)
 
     """
-    pbar = get_pbar()
-
+    cols = tr_obj.as_columns()
+    time = pd.DatetimeIndex(cols["time"])
     if by.upper() == "M":
-        counter = np.zeros(12, dtype=int)
-        for _, df in pbar(tr_obj.gb, leave=False):  # , desc="tracks"):
-            track_months = df.time.dt.month.unique()
-            for m in track_months:
-                counter[m - 1] += 1
+        # Count each track once in every month it is present in
+        months = time.month.values - 1
+        _, uniq = np.unique(np.column_stack([cols.track_index, months]), axis=0, return_index=True)
+        counter = np.bincount(months[uniq], minlength=12)
     if by.upper() == "W":
         # winter
         counter = np.zeros(n_winters, dtype=int)
-        for _, df in pbar(tr_obj.gb, leave=False):  # , desc="tracks"):
-            track_months = df.time.dt.month.unique()
-            track_years = df.time.dt.year.unique()
-
-            for i in range(n_winters):
-                if track_months[-1] <= 6:
-                    if track_years[0] == i + start_year + 1:
-                        counter[i] += 1
-                else:
-                    if track_years[-1] == i + start_year:
-                        counter[i] += 1
+        first_year = time.year.values[cols.track_offsets[:-1]]
+        last = cols.track_offsets[1:] - 1
+        # Tracks ending in the first half of the year are attributed to the previous winter
+        winter = np.where(time.month.values[last] <= 6, first_year - 1, time.year.values[last])
+        winter -= start_year
+        winter = winter[(winter >= 0) & (winter < n_winters)]
+        np.add.at(counter, winter, 1)
     return counter
 
 
+class MaskIndex:
+    """
+    Spatial index of masked points for fast proximity checks of cyclone tracks.
+
+    The index is built once from a land-sea mask and can be passed to `check_by_mask()`
+    instead of the mask, so that the mask is not processed for every track.
+    Masked points are stored in a k-d tree (if `scipy` is installed),
+    which is used to find candidates within the given distance of each track point.
+    """
+
+    def __init__(self, lsm, lmask_thresh=1, extent=None, r_planet=EARTH_RADIUS):
+        """
+        Initialise octant.misc.MaskIndex.
+
+        Parameters
+        ----------
+        lsm: xarray.DataArray
+            Two-dimensional land-sea mask
+        lmask_thresh: float, optional
+            Threshold of `lsm` values, for flexible land-mask filtering
+        extent: list, optional
+            Domain boundaries (lon_min, lon_max, lat_min, lat_max) to include in the mask,
+            e.g. `TrackRun.conf.extent`
+        r_planet: float, optional
+            Radius of the planet in metres
+            Default: EARTH_RADIUS
+        """
+        assert isinstance(lsm, xr.DataArray), "lsm variable should be an `xarray.DataArray`"
+        if extent is not None:
+            lsm = add_domain_bounds_to_mask(lsm, extent)
+        lon2d, lat2d = Grid.from_coords(lsm.longitude, lsm.latitude).mesh
+        masked = lsm.values >= lmask_thresh
+        self.lon = np.ascontiguousarray(lon2d[masked], dtype="double")
+        self.lat = np.ascontiguousarray(lat2d[masked], dtype="double")
+        self.r_planet = r_planet
+        try:
+            from scipy.spatial import cKDTree
+
+            self._tree = cKDTree(unit_xyz(self.lon, self.lat))
+        except ImportError:
+            msg = (
+                "scipy is not installed; MaskIndex falls back to checking every masked point, "
+                "which is slow. Install scipy (e.g. `pip install octant[mask]`)."
+            )
+            warnings.warn(msg, MissingDependencyWarning)
+            self._tree = None
+
+    def __len__(self):
+        """Get the number of masked points."""
+        return self.lon.shape[0]
+
+    def near_mask(self, lon, lat, dist):
+        """
+        Check which points are within a distance from masked points.
+
+        Parameters
+        ----------
+        lon, lat: array-like
+            Longitudes and latitudes of points
+        dist: float
+            Distance in metres
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean array, True for points close to the mask
+        """
+        lon = np.atleast_1d(np.asarray(lon, dtype="double"))
+        lat = np.atleast_1d(np.asarray(lat, dtype="double"))
+        if len(self) == 0 or lon.shape[0] == 0:
+            return np.zeros(lon.shape, dtype=bool)
+        if self._tree is None:
+            near = [
+                mask_tracks(
+                    np.ones((1, len(self))),
+                    self.lon[None, :],
+                    self.lat[None, :],
+                    np.array([[x, y]]),
+                    dist,
+                    r_planet=self.r_planet,
+                )
+                > 0
+                for x, y in zip(lon, lat)
+            ]
+            return np.array(near, dtype=bool)
+        # Chord length on the unit sphere with a margin for round-off errors
+        ang = min(dist / self.r_planet, np.pi)
+        chord = 2 * np.sin(ang / 2) * (1 + 1e-9) + 1e-12
+        candidates = self._tree.query_ball_point(unit_xyz(lon, lat), chord)
+        near = np.zeros(lon.shape, dtype=bool)
+        for p, cand in enumerate(candidates):
+            if len(cand) > 0:
+                # Exact check with the same formula as in `octant.utils.mask_tracks`
+                cand = np.asarray(cand)
+                dists = great_circle_arr(
+                    np.full(cand.shape, lon[p]),
+                    self.lon[cand],
+                    np.full(cand.shape, lat[p]),
+                    self.lat[cand],
+                    r_planet=self.r_planet,
+                ).base
+                near[p] = (dists <= dist).any()
+        return near
+
+    def masked_fraction(self, lonlat, dist):
+        """
+        Fraction of track points within a distance from masked points.
+
+        Parameters
+        ----------
+        lonlat: numpy.ndarray
+            Array of track's longitudes and latitudes of shape (P, 2)
+        dist: float
+            Distance in metres
+
+        Returns
+        -------
+        float
+
+        See Also
+        --------
+        octant.utils.mask_tracks
+        """
+        return self.near_mask(lonlat[:, 0], lonlat[:, 1], dist).sum() / lonlat.shape[0]
+
+
 def check_by_mask(
     ot,
     trackrun,
@@ -144,8 +283,10 @@ def check_by_mask(
         Cyclone track to check
     trackrun: octant.core.TrackRun
         (parent) track run instance to get lon/lat boundaries if present
-    lsm: xarray.DataArray
-        Two-dimensional land-sea mask
+    lsm: xarray.DataArray or octant.misc.MaskIndex
+        Two-dimensional land-sea mask or a pre-built index of it.
+        In the latter case, `lmask_thresh`, `check_domain_bounds` and `r_planet` are
+        taken from the index.
     lmask_thresh: float, optional
         Threshold of `lsm` values, for flexible land-mask filtering
     dist: float, optional
@@ -173,21 +314,35 @@ def check_by_mask(
     >>> check_by_mask(random_track, tr, land_mask, lmask_thresh=0.5)
     True
 
+    Build the mask index once to classify many tracks
+
+    >>> mask_index = MaskIndex(land_mask, lmask_thresh=0.5, extent=tr.conf.extent)
+    >>> check_by_mask(random_track, tr, mask_index)
+    True
+
     See Also
     --------
-    octant.core.TrackRun.classify, octant.utils.mask_tracks, octant.misc.check_far_from_boundaries
+    octant.core.TrackRun.classify, octant.utils.mask_tracks, octant.misc.check_far_from_boundaries,
+    octant.misc.MaskIndex
     """
+    if isinstance(lsm, MaskIndex):
+        return lsm.masked_fraction(ot.lonlat_c, dist * KM2M) <= time_frac
     assert isinstance(lsm, xr.DataArray), "lsm variable should be an `xarray.DataArray`"
-    lon2d, lat2d = np.meshgrid(lsm.longitude, lsm.latitude)
+    lon2d_c, lat2d_c = Grid.from_coords(lsm.longitude, lsm.latitude).mesh
     if check_domain_bounds:
         l_mask = add_domain_bounds_to_mask(lsm, trackrun.conf.extent)
     else:
         l_mask = lsm
     mask_c = ((l_mask.values >= lmask_thresh) * 1.0).astype("double", order="C")
-    lon2d_c = lon2d.astype("double", order="C")
-    lat2d_c = lat2d.astype("double", order="C")
     flag = (
-        mask_tracks(mask_c, lon2d_c, lat2d_c, ot.lonlat_c, dist * KM2M, r_planet=r_planet)
+        mask_tracks(
+            mask_c,
+            lon2d_c,
+            lat2d_c,
+            ot.lonlat_c,
+            dist * KM2M,
+            r_planet=r_planet,
+        )
         <= time_frac
     )
     return flag
@@ -316,12 +471,16 @@ def check_by_arr_thresh(ot, arr, arr_thresh, oper, dist, reduce="mean", r_planet
         raise ArgumentError(f"reduce={reduce} should be one of {allowed_ops}")
     op = getattr(operator, oper)
     assert isinstance(arr, xr.DataArray), "arr should be an `xarray.DataArray`"
-    lon2d, lat2d = np.meshgrid(arr.longitude, arr.latitude)
+    lon2d_c, lat2d_c = Grid.from_coords(arr.longitude, arr.latitude).mesh
     arr_c = arr.values.astype("double", order="C")
-    lon2d_c = lon2d.astype("double", order="C")
-    lat2d_c = lat2d.astype("double", order="C")
     mean_vals = mean_arr_along_track(
-        arr_c, lon2d_c, lat2d_c, ot.lonlat_c, dist * KM2M, r_planet=r_planet
+        arr_c,
+        lon2d_c,
+        lat2d_c,
+        ot.lonlat_c,
+        dist * KM2M,
+        r_planet=r_planet,
+        num_threads=RUNTIME.num_threads,
     ).base
     if reduce == "mean":
         flag = op(mean_vals.mean(), arr_thresh)
@@ -362,7 +521,7 @@ def add_domain_bounds_to_mask(mask, lonlat_box):
     octant.utils.mask_tracks, octant.misc.check_far_from_boundaries
     """
     assert isinstance(mask, xr.DataArray), "mask variable should be an `xarray.DataArray`"
-    lon2d, lat2d = np.meshgrid(mask.longitude, mask.latitude)
+    lon2d, lat2d = Grid.from_coords(mask.longitude, mask.latitude).mesh
 
     lon1, lon2, lat1, lat2 = lonlat_box
 
@@ -6,11 +6,11 @@ import pandas as pd
 
 from .decor import ReprTrackSettings
 from .exceptions import LoadError
-from .params import HOUR, M2KM
+from .params import HOUR, M2KM, MUX_NAMES
 from .utils import great_circle, total_dist
 
 
-__all__ = ("OctantTrack", "TrackSettings")
+__all__ = ("OctantTrack", "TrackColumns", "TrackSettings")
 
 
 class _OctantSeries(pd.Series):
@@ -60,8 +60,8 @@ class OctantTrack(pd.DataFrame):
     def coord_view(self):
         """Numpy view of track coordinates: longitude, latitude, time."""
         return (
-            self.lon.values.view("double"),
-            self.lat.values.view("double"),
+            np.ascontiguousarray(self.lon.values, dtype="double"),
+            np.ascontiguousarray(self.lat.values, dtype="double"),
             self.time.values.view("int64"),
         )
 
@@ -186,6 +186,201 @@ class OctantTrack(pd.DataFrame):
         return plot(self, ax=ax, **kwargs)
 
 
+class TrackColumns:
+    """
+    Columnar container of cyclone tracks.
+
+    Each of the data columns of all tracks is stored in one contiguous 1D array,
+    and the points of the k-th track are in the slice
+    ``track_offsets[k]:track_offsets[k + 1]`` of every column, like in the compressed
+    sparse row layout. Tracks are stored in the ascending order of their indices,
+    as in `groupby("track_idx")`.
+
+    Attributes
+    ----------
+    columns: dict
+        Dictionary of 1D numpy arrays of the same length (number of points)
+    track_offsets: numpy.ndarray
+        Integer array of shape (K+1,), where K is the number of tracks
+    track_ids: numpy.ndarray
+        Track indices of shape (K,)
+    row_idx: numpy.ndarray
+        Row indices within each track, of the same length as columns
+    """
+
+    _mux_names = MUX_NAMES
+
+    def __init__(self, columns, track_offsets, track_ids=None, row_idx=None):
+        """
+        Initialise octant.parts.TrackColumns.
+
+        Parameters
+        ----------
+        columns: dict
+            Dictionary of 1D arrays of the same length
+        track_offsets: array-like
+            Offsets of tracks in the arrays, starting with 0 and ending with the array length
+        track_ids: array-like, optional
+            Track indices. By default, tracks are numbered from 0.
+        row_idx: array-like, optional
+            Row indices within each track. By default, rows are numbered from 0.
+        """
+        self.columns = {k: np.asarray(v) for k, v in columns.items()}
+        self.track_offsets = np.asarray(track_offsets, dtype=np.intp)
+        n_tracks = self.track_offsets.shape[0] - 1
+        if track_ids is None:
+            track_ids = np.arange(n_tracks)
+        self.track_ids = np.asarray(track_ids)
+        if row_idx is None:
+            row_idx = np.arange(self.n_points) - np.repeat(self.track_offsets[:-1], self.lengths)
+        self.row_idx = np.asarray(row_idx)
+
+    @classmethod
+    def from_df(cls, df):
+        """
+        Create TrackColumns from a multi-index DataFrame of tracks.
+
+        Parameters
+        ----------
+        df: octant.parts.OctantTrack
+            DataFrame with (track_idx, row_idx) index
+
+        Returns
+        -------
+        octant.parts.TrackColumns
+        """
+        track_idx = df.index.get_level_values(0).values
+        if (np.diff(track_idx) >= 0).all():
+            order = slice(None)
+        else:
+            order = np.argsort(track_idx, kind="stable")
+        track_ids, starts = np.unique(track_idx[order], return_index=True)
+        offsets = np.append(starts, track_idx.shape[0])
+        columns = {k: np.ascontiguousarray(df[k].values[order]) for k in df.columns}
+        row_idx = df.index.get_level_values(1).values[order]
+        return cls(columns, offsets, track_ids=track_ids, row_idx=row_idx)
+
+    def to_df(self):
+        """
+        Convert TrackColumns to a multi-index DataFrame.
+
+        Returns
+        -------
+        octant.parts.OctantTrack
+        """
+        mux = pd.MultiIndex.from_arrays([self.track_index, self.row_idx], names=self._mux_names)
+        return OctantTrack(self.columns, index=mux, columns=list(self.columns))
+
+    def __len__(self):
+        """Get the number of tracks."""
+        return self.track_ids.shape[0]
+
+    def __getitem__(self, key):
+        """Get a column by its name."""
+        return self.columns[key]
+
+    def __iter__(self):
+        """Iterate over pairs of track index and a dictionary of column slices."""
+        for k, idx in enumerate(self.track_ids):
+            yield idx, self.track(k)
+
+    def track(self, k):
+        """
+        Get the k-th track without copying data.
+
+        Parameters
+        ----------
+        k: int
+            Position of the track (not its index)
+
+        Returns
+        -------
+        dict
+            Dictionary of views of the columns
+        """
+        sl = slice(self.track_offsets[k], self.track_offsets[k + 1])
+        return {name: arr[sl] for name, arr in self.columns.items()}
+
+    def take(self, k):
+        """
+        Select tracks by their positions.
+
+        Parameters
+        ----------
+        k: array-like
+            Positions of tracks (not their indices)
+
+        Returns
+        -------
+        octant.parts.TrackColumns
+            Copy of the selected tracks
+        """
+        k = np.asarray(k, dtype=np.intp)
+        lengths = self.lengths[k]
+        rows = np.arange(lengths.sum()) + np.repeat(
+            self.track_offsets[k] - np.cumsum(lengths) + lengths, lengths
+        )
+        return self.__class__(
+            {name: arr[rows] for name, arr in self.columns.items()},
+            np.append(0, np.cumsum(lengths)),
+            track_ids=self.track_ids[k],
+            row_idx=self.row_idx[rows],
+        )
+
+    @property
+    def n_points(self):
+        """Total number of points."""
+        return int(self.track_offsets[-1])
+
+    @property
+    def lengths(self):
+        """Number of points in each track."""
+        return np.diff(self.track_offsets)
+
+    @property
+    def track_index(self):
+        """Track index of each point."""
+        return np.repeat(self.track_ids, self.lengths)
+
+    @property
+    def coord_view(self):
+        """Numpy view of coordinates of all tracks: longitude, latitude, time."""
+        return (
+            np.ascontiguousarray(self.columns["lon"], dtype="double"),
+            np.ascontiguousarray(self.columns["lat"], dtype="double"),
+            np.ascontiguousarray(self.columns["time"]).view("int64"),
+        )
+
+    def first(self, key):
+        """First value of the column in each track."""
+        return self.columns[key][self.track_offsets[:-1]]
+
+    def last(self, key):
+        """Last value of the column in each track."""
+        return self.columns[key][self.track_offsets[1:] - 1]
+
+    def reduceat(self, ufunc, key):
+        """
+        Reduce the column within each track.
+
+        Parameters
+        ----------
+        ufunc: numpy.ufunc
+            Binary function, e.g. `numpy.maximum`
+        key: str
+            Column name
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (K,)
+        """
+        arr = self.columns[key]
+        if len(self) == 0:
+            return arr[:0]
+        return ufunc.reduceat(arr, self.track_offsets[:-1])
+
+
 class TrackSettings:
     """
     Dictionary-like container of tracking settings.
@@ -3,14 +3,24 @@ import contextlib
 import itertools
 import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
 import numpy as np
 import numpy.testing as npt
 
-from octant import core, parts
-from octant.exceptions import ArgumentError, GridError, LoadError
+from octant import core, misc, parts
+from octant.exceptions import (
+    ArgumentError,
+    ConcatenationError,
+    GridError,
+    LoadError,
+    SelectError,
+)
+from octant.grid import Grid
+from octant.io import ARCH_KEY_CAT, ARCH_KEY_OFFSETS, PMCTRACKLoader, STARSLoader
 
 import pandas as pd
 
@@ -83,6 +93,115 @@ def test_load_data():
     assert not tr.is_categorised
 
 
+@pytest.mark.parametrize(
+    "loader_kw",
+    [
+        {"n_workers": 1},
+        {"n_workers": 2},
+        {"engine": "native"},
+        {"engine": "native", "n_workers": 2},
+    ],
+)
+def test_load_data_n_workers(trackrun, loader_kw):
+    """Load data from files parsed into arrays, possibly in several processes."""
+    tr = core.TrackRun(TEST_DIR, loader_kw=loader_kw)
+    pd.testing.assert_frame_equal(tr.data, trackrun.data)
+    assert tr.tstep_h == trackrun.tstep_h
+
+
+def test_iter_chunks_n_workers(trackrun):
+    """Read chunks of tracks parsed in several processes, with a bounded number of files."""
+    chunks = list(PMCTRACKLoader(TEST_DIR, n_workers=2).iter_chunks(chunk_size=10))
+    assert len(chunks) == 8
+    pd.testing.assert_frame_equal(pd.concat(chunks), trackrun.data)
+
+    class CountingExecutor(ThreadPoolExecutor):
+        n_submitted = 0
+
+        def submit(self, *args, **kwargs):
+            self.n_submitted += 1
+            return super().submit(*args, **kwargs)
+
+    loader = PMCTRACKLoader(TEST_DIR)
+    with CountingExecutor(max_workers=2) as executor:
+        results = loader._iter_futures(executor, 4)
+        next(results)
+        assert executor.n_submitted == 5
+        assert sum(1 for _ in results) == len(loader.filelist) - 1
+        assert executor.n_submitted == len(loader.filelist)
+
+
+def test_load_data_downcast(trackrun):
+    """Load data with compact data types."""
+    tr = core.TrackRun(TEST_DIR, loader_kw={"downcast": True})
+    assert tr.data.lon.dtype == np.float32
+    assert tr.data.vortex_type.dtype == np.int8
+    assert tr.data.time.dtype == trackrun.data.time.dtype
+    nbytes = [t.data.memory_usage(index=False).sum() for t in (tr, trackrun)]
+    assert nbytes[0] < 0.6 * nbytes[1]
+    pd.testing.assert_frame_equal(tr.data, trackrun.data, check_dtype=False, rtol=1e-6)
+    npt.assert_allclose(tr.track_stats(), trackrun.track_stats(), rtol=1e-4)
+
+
+def test_load_data_cache(trackrun, tmp_path):
+    """Load data from cache, and check that the cache is updated when the files change."""
+    data_dir = tmp_path / "data"
+    shutil.copytree(TEST_DIR, data_dir)
+    cache_dir = tmp_path / "cache"
+    tr = core.TrackRun(data_dir, cache_dir=cache_dir)
+    (cache_file,) = cache_dir.glob("*.npz")
+
+    tr = core.TrackRun(data_dir, cache_dir=cache_dir)
+    assert tr._data is None
+    assert len(tr) == len(trackrun)
+    assert tr.tstep_h == trackrun.tstep_h
+    pd.testing.assert_frame_equal(tr.data, trackrun.data)
+
+    # Remove the last line of one of the files
+    fname = sorted(data_dir.glob("vortrack*0001.txt"))[0]
+    fname.write_text("".join(fname.read_text().splitlines(keepends=True)[:-1]))
+    tr = core.TrackRun(data_dir, cache_dir=cache_dir)
+    assert len(list(cache_dir.glob("*.npz"))) == 2
+    assert tr.data.shape[0] == trackrun.data.shape[0] - 1
+
+    # Columns of object data type are not cached
+    cols = tr.as_columns()
+    cols = parts.TrackColumns(
+        {**cols.columns, "name": cols["lon"].astype(str).astype(object)}, cols.track_offsets
+    )
+    loader = PMCTRACKLoader(data_dir)
+    another_dir = tmp_path / "another_cache"
+    loader.write_cache(another_dir, cols)
+    assert loader.read_cache(another_dir) is None
+
+
+def test_stars_loader(tmp_path):
+    """Read tracks from a STARS-like file with unsorted track numbers."""
+    (tmp_path / "stars.txt").write_text(
+        "\n".join(
+            5 * ["header"]
+            + [
+                "N Year Month Day Hour Minute Lat Lon",
+                "7 2002 1 7 12 00 71.5 14.0",
+                "3 2002 1 8 23 30 72.5 15.0",
+                "7 2002 1 7 13 00 71.0 14.5",
+            ]
+        )
+    )
+    data = STARSLoader(tmp_path)()
+    assert list(data.columns) == ["time", "N", "Lat", "Lon"]
+    npt.assert_array_equal(data.index.get_level_values(0), [0, 1, 1])
+    npt.assert_array_equal(data.index.get_level_values(1), [0, 0, 1])
+    npt.assert_array_equal(data.N, [3, 7, 7])
+    npt.assert_array_equal(
+        data.time,
+        pd.to_datetime(["2002-01-08 23:30", "2002-01-07 12:00", "2002-01-07 13:00"]),
+    )
+    chunks = list(STARSLoader(tmp_path).iter_chunks(chunk_size=1))
+    assert len(chunks) == 2
+    pd.testing.assert_frame_equal(chunks[1], data.loc[[1]])
+
+
 def test_loaderror():
     """Test raising LoadError."""
     with pytest.raises(LoadError):
@@ -111,6 +230,239 @@ def test_archive(trackrun):
         assert isinstance(another.conf, parts.TrackSettings)
 
 
+def test_archive_lazy():
+    """Test reading tracks on demand from an archive in table format."""
+    tr = core.TrackRun(TEST_DIR)
+    tr.classify([("long", ["lifetime_h >= 6"])])
+    with create_tmp_file() as f:
+        tr.to_archive(f, format="table")
+        pd.testing.assert_frame_equal(core.TrackRun.from_archive(f).data, tr.data)
+
+        another = core.TrackRun.from_archive(f, lazy=True)
+        assert len(another) == len(tr)
+        assert another.size("long") == tr.size("long")
+        assert str(another) == str(tr)
+        pd.testing.assert_frame_equal(another["long"], tr["long"])
+        xr.testing.assert_equal(
+            another.density(np.arange(-20, 50.0), np.arange(60, 85.0), subset="long"),
+            tr.density(np.arange(-20, 50.0), np.arange(60, 85.0), subset="long"),
+        )
+        sliced = another.time_slice("2013-03-24", "2013-03-26 12:00")
+        pd.testing.assert_frame_equal(
+            sliced.data, tr.time_slice("2013-03-24", "2013-03-26 12:00").data
+        )
+        # Tracks and a query are combined
+        track_ids = tr.cats.index[tr.cats["long"]]
+        in_range = tr.data.time >= pd.Timestamp("2013-03-25")
+        pd.testing.assert_frame_equal(
+            another._archive.read(track_ids=track_ids, where="time >= '2013-03-25'"),
+            tr.data[tr.data.index.get_level_values(0).isin(track_ids) & in_range],
+        )
+        assert another._data is None
+        pd.testing.assert_frame_equal(another.data, tr.data)
+        pd.testing.assert_frame_equal(another.cats, tr.cats)
+
+        tr.to_archive(f)
+        with pytest.raises(LoadError):
+            core.TrackRun.from_archive(f, lazy=True)
+
+
+def test_append_to_archive():
+    """Append tracks to an archive piece by piece and consolidate it."""
+    tr = core.TrackRun(TEST_DIR)
+    tr.classify([("long", ["lifetime_h >= 6"])])
+    track_idx = tr.data.index.get_level_values(0)
+    with create_tmp_file() as f:
+        for selected in [track_idx < 30, (track_idx >= 30) & (track_idx < 50), track_idx >= 50]:
+            piece = core.TrackRun.from_columns(parts.TrackColumns.from_df(tr.data[selected]))
+            piece.conf = tr.conf.copy()
+            piece.is_categorised = True
+            piece.cats = tr.cats.loc[track_idx[selected].unique()]
+            # Renumber tracks in each piece
+            piece.data = piece.data.set_index(
+                [piece.data.index.get_level_values(0) + 100, piece.data.index.get_level_values(1)]
+            )
+            piece.cats.index += 100
+            piece.append_to_archive(f)
+        another = core.TrackRun.from_archive(f)
+        pd.testing.assert_frame_equal(another.data, tr.data)
+        pd.testing.assert_frame_equal(another.cats, tr.cats)
+        assert another.tstep_h == tr.tstep_h
+        assert another.conf.to_dict() == tr.conf.to_dict()
+        pd.testing.assert_frame_equal(core.TrackRun.from_archive(f, lazy=True)["long"], tr["long"])
+
+        with pd.HDFStore(f, mode="r") as store:
+            for key in [ARCH_KEY_OFFSETS, ARCH_KEY_CAT]:
+                assert store.get_storer(key).is_table
+                assert store.get_storer(key).nrows == len(tr)
+
+        core.TrackRun.consolidate_archive(f)
+        pd.testing.assert_frame_equal(core.TrackRun.from_archive(f).data, tr.data)
+
+        # A new category is added to the file and is False for the tracks already there
+        piece.classify([("short", ["lifetime_h < 6"])], clear=False)
+        piece.append_to_archive(f)
+        another = core.TrackRun.from_archive(f)
+        assert list(another.cats.columns) == ["long", "short"]
+        assert another.size("short") == piece.size("short")
+        assert another.size("long") == tr.size("long") + piece.size("long")
+
+        piece.tstep_h = 3
+        with pytest.raises(ConcatenationError):
+            piece.append_to_archive(f)
+
+
+def test_concat():
+    """Combine several TrackRuns at once."""
+    tr = core.TrackRun(TEST_DIR)
+    tr.classify([("long", ["lifetime_h >= 6"])])
+    track_idx = tr.data.index.get_level_values(0)
+    pieces = []
+    # Overlapping pieces, so that the last track of one is the first track of the next one
+    for selected in [track_idx <= 30, (track_idx >= 30) & (track_idx <= 50), track_idx >= 50]:
+        piece = core.TrackRun.from_columns(parts.TrackColumns.from_df(tr.data[selected]))
+        piece.conf = tr.conf.copy()
+        piece.is_categorised = True
+        piece.cats = tr.cats.loc[track_idx[selected].unique()]
+        pieces.append(piece)
+    combined = core.TrackRun.concat(pieces)
+    assert len(combined) == len(tr) + 2
+    assert combined.size("long") == sum(piece.size("long") for piece in pieces)
+    npt.assert_array_equal(combined.cats.index, np.arange(len(tr) + 2))
+    pd.testing.assert_frame_equal(
+        combined.data.loc[31:51].reset_index(drop=True),
+        tr.data.loc[30:50].reset_index(drop=True),
+    )
+    assert combined.conf.to_dict() == tr.conf.to_dict()
+    pd.testing.assert_frame_equal((pieces[0] + pieces[1] + pieces[2]).data, combined.data)
+    extended = core.TrackRun()
+    for piece in pieces:
+        extended.extend(piece)
+    pd.testing.assert_frame_equal(extended.data, combined.data)
+    pd.testing.assert_frame_equal(extended.cats, combined.cats)
+
+    # Categories of tracks that are not in the data are kept
+    sliced = tr.time_slice("2013-03-24", "2013-03-26 12:00")
+    assert len(sliced.cats) == len(tr) > len(sliced)
+    combined = sliced + tr
+    assert len(combined.cats) == 2 * len(tr)
+    npt.assert_array_equal(combined.cats.values, np.concatenate([sliced.cats, tr.cats]))
+    assert combined.size("long") == sliced.size("long") + tr.size("long")
+    sliced_idx = sliced.data.index.get_level_values(0)
+    npt.assert_array_equal(combined.data.index.get_level_values(0)[: len(sliced_idx)], sliced_idx)
+
+
+def test_caches():
+    """Check that cached track indices, sizes, groupby and columns are updated with data."""
+    tr = core.TrackRun(TEST_DIR)
+    n_tracks = len(tr)
+    tr.classify([("long", ["lifetime_h >= 6"])])
+    n_long = tr.data.loc[tr.cats.index[tr.cats["long"]], :].index.get_level_values(0).nunique()
+    assert tr.size("long") == n_long
+    pd.testing.assert_frame_equal(tr["long"], tr.data.loc[tr.cats.index[tr.cats["long"]], :])
+    assert tr.gb is tr.gb
+    assert tr.gb.ngroups == n_tracks
+    assert tr.as_columns() is tr.as_columns()
+    assert tr.as_columns("long") is tr.as_columns("long")
+    sub_cols = tr.as_columns("long")
+    des = parts.TrackColumns.from_df(tr["long"])
+    npt.assert_array_equal(sub_cols.track_offsets, des.track_offsets)
+    npt.assert_array_equal(sub_cols.track_ids, des.track_ids)
+    npt.assert_array_equal(sub_cols.row_idx, des.row_idx)
+    pd.testing.assert_frame_equal(sub_cols.to_df(), tr["long"])
+
+    tr.cats = tr.cats.rename(columns={"long": "lng"})
+    assert tr.size("lng") == n_long
+    with pytest.raises(SelectError):
+        tr.size("long")
+
+    tr.data = tr.data.loc[: n_tracks // 2 - 1]
+    assert len(tr) == tr.size() == n_tracks // 2
+    assert tr.gb.ngroups == n_tracks // 2
+    assert len(tr.as_columns()) == n_tracks // 2
+    assert tr.size("lng") == tr.cats["lng"].iloc[: n_tracks // 2].sum()
+
+
+def test_memmap(tmp_path):
+    """Test to_memmap() and from_memmap() methods."""
+    tr = core.TrackRun(TEST_DIR)
+    tr.classify([("long", ["lifetime_h >= 6"])])
+    tr.to_memmap(tmp_path)
+    another = core.TrackRun.from_memmap(tmp_path)
+    cols = another.as_columns()
+    assert isinstance(cols["lon"].base, np.memmap)
+    assert not cols["lon"].flags.writeable
+    pd.testing.assert_frame_equal(another.track_stats(), tr.track_stats())
+    assert another._data is None
+    pd.testing.assert_frame_equal(another.data, tr.data)
+    pd.testing.assert_frame_equal(another.cats, tr.cats)
+    assert another.tstep_h == tr.tstep_h
+    assert another.conf.to_dict() == tr.conf.to_dict()
+
+
+@pytest.mark.parametrize("partition_by", [None, "year", 10])
+def test_parquet(trackrun, tmp_path, partition_by):
+    """Test to_parquet() and from_parquet() methods."""
+    pytest.importorskip("pyarrow")
+    tr = core.TrackRun(TEST_DIR)
+    tr.classify([("long", ["lifetime_h >= 6"])])
+    tr.to_parquet(tmp_path, partition_by=partition_by)
+    another = core.TrackRun.from_parquet(tmp_path)
+    pd.testing.assert_frame_equal(another.data, tr.data)
+    pd.testing.assert_frame_equal(another.cats, tr.cats)
+    assert another.sources == tr.sources
+    assert another.tstep_h == tr.tstep_h
+    assert another.conf.to_dict() == tr.conf.to_dict()
+
+    time_range = (datetime(2013, 3, 24), datetime(2013, 3, 26, 12))
+    subset = core.TrackRun.from_parquet(tmp_path, columns=["lon", "time"], time_range=time_range)
+    in_range = (tr.data.time >= time_range[0]) & (tr.data.time <= time_range[1])
+    pd.testing.assert_frame_equal(subset.data, tr.data.loc[in_range, ["lon", "time"]])
+    # Categories of all tracks are kept, as in time_slice()
+    sliced = tr.time_slice(*time_range)
+    pd.testing.assert_frame_equal(subset.cats, sliced.cats)
+    assert len(subset.cats) == len(tr) > len(subset)
+    assert subset.size("long") == sliced.size("long") < tr.size("long")
+
+    # Projection without the time column
+    subset = core.TrackRun.from_parquet(tmp_path, columns=["lon", "lat"], time_range=time_range)
+    pd.testing.assert_frame_equal(subset.data, tr.data.loc[in_range, ["lon", "lat"]])
+    assert subset.tstep_h == tr.tstep_h
+
+    # Partitions of the old archive are removed
+    tr.time_slice(*time_range).to_parquet(tmp_path, partition_by=partition_by)
+    another = core.TrackRun.from_parquet(tmp_path)
+    pd.testing.assert_frame_equal(another.data, tr.time_slice(*time_range).data)
+    # Other directories are not overwritten
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "file.txt").write_text("")
+    with pytest.raises(ArgumentError):
+        tr.to_parquet(tmp_path / "other")
+
+
+def test_columns(trackrun):
+    """Test as_columns() and from_columns() methods."""
+    cols = trackrun.as_columns()
+    assert isinstance(cols, parts.TrackColumns)
+    assert len(cols) == len(trackrun)
+    another = core.TrackRun.from_columns(cols)
+    assert len(another) == len(trackrun)
+    assert another.as_columns() is cols
+    assert another.tstep_h == trackrun.tstep_h
+    assert another.data.equals(trackrun.data)
+    # Columns are kept after the DataFrame is created
+    assert another.as_columns() is cols
+
+
+def test_track_stats(trackrun):
+    """Compare track properties calculated at once with those of each track."""
+    stats = trackrun.track_stats()
+    assert stats.shape == (len(trackrun), 5)
+    for name in stats.columns:
+        npt.assert_allclose(stats[name], trackrun.gb.apply(lambda ot: getattr(ot, name)))
+    assert core.TrackRun().track_stats().shape[0] == 0
+
+
 def test_categorise_by_percentile_simple(trackrun):
     """Categorise TrackRun by percentile."""
     trackrun.categorise_by_percentile("max_vort")
@@ -209,6 +561,106 @@ def test_classify_incl(trackrun):
     assert trackrun.size("b|a") == 10
 
 
+def test_classify_rules(trackrun):
+    """Test classify() with string rules instead of functions."""
+    conds = [
+        ("a", ["lifetime_h >= 6"]),
+        (
+            "b",
+            [
+                lambda ot: (ot.vortex_type != 0).sum() / ot.shape[0] < 0.2,
+                "gen_lys_dist_km > 300",
+            ],
+        ),
+        ("c", ["max_vort pct 90"]),
+    ]
+    trackrun.classify(conds, inclusive=False)
+    assert trackrun.size("b") == 11
+    des = trackrun.gb.apply(lambda ot: ot.max_vort)
+    assert trackrun.size("c") == (des >= np.percentile(des, 90)).sum()
+    # Rules do not need the DataFrame
+    another = core.TrackRun.from_columns(trackrun.as_columns())
+    another.classify(conds[::2])
+    assert another._data is None
+    pd.testing.assert_frame_equal(another.cats, trackrun.cats[["a", "c"]])
+    for rule in ["lifetime_h >= six", "lifetime_h ~ 6", "blah > 1"]:
+        with pytest.raises(ArgumentError):
+            trackrun.classify([("a", [rule])])
+    # Leave the TrackRun categorised as in test_classify_incl()
+    trackrun.classify(conds[:2], inclusive=True)
+    assert trackrun.size("a") == 31
+    assert trackrun.size("b|a") == 10
+
+
+def test_classify_n_workers():
+    """Test classify() in several processes, with arrays passed via shared memory."""
+    trackrun = core.TrackRun(TEST_DIR)
+    lon, lat = np.arange(-20.0, 50.0, 0.5), np.arange(60.0, 85.0, 0.5)
+    lsm = xr.DataArray(
+        (np.random.RandomState(0).rand(lat.size, lon.size) > 0.95) * 1.0,
+        dims=("latitude", "longitude"),
+        coords={"latitude": lat, "longitude": lon},
+    )
+    conds = [
+        ("a", ["lifetime_h >= 6"]),
+        ("b", [partial(misc.check_by_mask, trackrun=trackrun, lsm=lsm, dist=50.0)]),
+    ]
+    trackrun.classify(conds, inclusive=True)
+    des = trackrun.cats.copy()
+    trackrun.classify(conds, inclusive=True, n_workers=2)
+    assert trackrun.cats.equals(des)
+
+
+def test_classify_n_workers_release():
+    """Check that shared memory is freed when a condition raises in a worker process."""
+    shm_dir = Path("/dev/shm")
+    if not shm_dir.is_dir():
+        pytest.skip("Shared memory blocks are not visible as files")
+    trackrun = core.TrackRun(TEST_DIR)
+    lsm = xr.DataArray(
+        np.zeros((3, 4)),
+        dims=("latitude", "longitude"),
+        coords={"latitude": [60.0, 70.0, 80.0], "longitude": [-20.0, 0.0, 20.0, 40.0]},
+    )
+    before = set(shm_dir.iterdir())
+    conds = [("a", [partial(misc.check_by_mask, trackrun=trackrun, lsm=lsm, dist="far")])]
+    with pytest.raises(TypeError):
+        trackrun.classify(conds, n_workers=2)
+    assert set(shm_dir.iterdir()) <= before
+
+
+def test_classify_n_workers_shared_cond():
+    """Test classify() in several processes with several functions in one condition."""
+    trackrun = core.TrackRun(TEST_DIR)
+    lon, lat = np.arange(-20.0, 50.0, 0.5), np.arange(60.0, 85.0, 0.5)
+    rs = np.random.RandomState(0)
+    masks = [
+        xr.DataArray(
+            (rs.rand(lat.size, lon.size) > thresh) * 1.0,
+            dims=("latitude", "longitude"),
+            coords={"latitude": lat, "longitude": lon},
+        )
+        for thresh in (0.95, 0.9)
+    ]
+    conds = [
+        (
+            "a",
+            [
+                partial(misc.check_by_mask, trackrun=trackrun, lsm=masks[0], dist=50.0),
+                partial(misc.check_by_mask, trackrun=trackrun, lsm=masks[1], dist=25.0),
+            ],
+        ),
+    ]
+    trackrun.classify(conds)
+    des = trackrun.cats.copy()
+    trackrun.classify(conds, n_workers=2)
+    assert trackrun.cats.equals(des)
+    # The result is the conjunction of both functions
+    for func in conds[0][1]:
+        trackrun.classify([("a", [func])])
+        assert (trackrun.cats["a"] | ~des["a"]).all()
+
+
 def test_match_bs2000(trackrun, ref_set):
     """Use cached TrackRun and tracks from ref_set to test match_tracks() method."""
     subset = "b|a"
@@ -221,6 +673,33 @@ def test_match_bs2000(trackrun, ref_set):
     npt.assert_allclose(actual_dm, dm)
 
 
+@pytest.mark.parametrize("method", ["intersection", "simple"])
+def test_match_prefilter(trackrun, ref_set, method):
+    """Check that pruning pairs of tracks does not change the matching result."""
+    # Times of the reference tracks are irregular, so match the run with itself instead
+    others = trackrun if method == "intersection" else ref_set
+    kw = dict(method=method, thresh_dist=250.0)
+    des = trackrun.match_tracks(others, prefilter_time=False, prefilter_bbox=False, **kw)
+    act = trackrun.match_tracks(others, prefilter_time=True, prefilter_bbox=True, **kw)
+    assert len(des) > 0
+    assert act == des
+
+
+def test_match_prefilter_seam(trackrun):
+    """Check that pruning pairs of tracks works for tracks on both sides of the 0/360 seam."""
+    tr = core.TrackRun.from_columns(parts.TrackColumns.from_df(trackrun.data))
+    # Tracks west of the prime meridian become tracks east of it
+    df = trackrun.data.copy()
+    df["lon"] = df["lon"] % 360
+    others = core.TrackRun.from_columns(parts.TrackColumns.from_df(df))
+    assert (tr.data.lon < 0).groupby(level=0).all().any()
+    kw = dict(method="intersection", thresh_dist=250.0)
+    des = tr.match_tracks(tr, prefilter_bbox=False, **kw)
+    act = tr.match_tracks(others, prefilter_bbox=True, **kw)
+    assert len(des) > 0
+    assert act == des
+
+
 def test_density_cell_point(trackrun):
     """Calculate cell point density from cached TrackRun."""
     dens = trackrun.density(
@@ -233,6 +712,36 @@ def test_density_cell_point(trackrun):
     npt.assert_allclose(actual_dens, dens.values)
 
 
+def test_density_grid(trackrun):
+    """Check that density is the same for coordinate arrays and a Grid object."""
+    grid = Grid.from_coords(lon1d, lat1d)
+    for method in ["cell", "radius"]:
+        des = trackrun.density(lon1d, lat1d, subset="all", by="track", method=method)
+        act = trackrun.density(grid, subset="all", by="track", method=method)
+        assert act.equals(des)
+
+
+@pytest.mark.parametrize("method", ["cell", "radius"])
+def test_density_accumulator(trackrun, method):
+    """Compare density accumulated from chunks of tracks with density of the whole run."""
+    loader = PMCTRACKLoader(TEST_DIR)
+    with create_tmp_file() as f:
+        trackrun.to_archive(f, format="table")
+        lazy = core.TrackRun.from_archive(f, lazy=True)
+        for source in [loader, lazy, trackrun]:
+            for by in ["point", "track", "genesis", "lysis"]:
+                des = trackrun.density(lon1d, lat1d, subset="all", by=by, method=method)
+                acc = core.DensityAccumulator(lon1d, lat1d, by=by, method=method)
+                for chunk in source.iter_chunks(chunk_size=10):
+                    acc.add(chunk)
+                assert acc.n_chunks == 8
+                assert acc.result().identical(des)
+        # Chunks are read from the file one by one
+        assert lazy._data is None
+        chunks = list(lazy._archive.iter_chunks(chunk_size=10))
+        pd.testing.assert_frame_equal(pd.concat(chunks), trackrun.data)
+
+
 def test_density_cell_point_grid_bounds(trackrun):
     """Calculate cell point density with different grid from cached TrackRun."""
     dens = trackrun.density(
@@ -256,3 +765,13 @@ def test_density_argumenterror(trackrun):
     """Test raising ArgumentError in density."""
     with pytest.raises(ArgumentError):
         trackrun.density(lon1d=lon1d, lat1d=lat1d, by="blah")
+
+
+def test_density_rad_point(trackrun):
+    """Calculate radius point density from cached TrackRun."""
+    dens = trackrun.density(
+        lon1d=lon1d, lat1d=lat1d, subset="all", by="point", method="radius", dist=111.0
+    )
+    assert isinstance(dens, xr.DataArray)
+    assert lat1d.shape + lon1d.shape == dens.shape
+    assert dens.attrs["units"] == "km-2"
@@ -3,6 +3,9 @@ import numpy as np
 import numpy.testing as npt
 
 from octant import grid
+from octant.exceptions import GridError
+
+import pytest
 
 
 def test_cell_centres():
@@ -47,3 +50,27 @@ def test_grid_cell_areas():
     lat = np.array([-1, 0])
     act = grid.grid_cell_areas(lon, lat)
     npt.assert_allclose(act, des)
+
+
+def test_grid():
+    """Test Grid geometry and its cache."""
+    lon, lat = np.arange(0.0, 3.0), np.array([-1.0, 0.0])
+    g = grid.Grid.from_coords(lon, lat)
+    assert g is grid.Grid.from_coords(lon.astype(int), lat)
+    assert g is not grid.Grid.from_coords(lon, lat, grid_centres=False)
+    assert g.shape == (2, 3)
+    npt.assert_allclose(g.bounds[0], grid.cell_bounds(lon))
+    npt.assert_allclose(g.mesh[1], [[-1.0, -1.0, -1.0], [0.0, 0.0, 0.0]])
+    assert g.mesh[0].flags.c_contiguous
+    npt.assert_allclose(g.areas(), grid.grid_cell_areas(lon, lat))
+    npt.assert_allclose(np.linalg.norm(g.xyz, axis=1), 1.0)
+    g_bnd = grid.Grid(g.bounds[0], g.bounds[1], grid_centres=False)
+    npt.assert_allclose(g_bnd.centres[0], lon)
+    # Arrays of the shared grid cannot be changed by one of its users
+    for arr in [*g.centres, *g.bounds, *g.mesh, g.xyz, g.areas()]:
+        with pytest.raises(ValueError):
+            arr[0] = 0.0
+    with pytest.raises(GridError):
+        grid.Grid(g.mesh[0], lat)
+    with pytest.raises(GridError):
+        grid.cell_bounds(np.array([0.0, 1.0, 3.0]))
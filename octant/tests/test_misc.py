@@ -1,10 +1,17 @@
 """Test the misc submodule."""
+import sys
 from pathlib import Path
 
+import numpy as np
+
 from octant import core, misc
+from octant.exceptions import MissingDependencyWarning
+from octant.grid import Grid
 
 import pytest
 
+import xarray as xr
+
 
 TEST_DATA = Path(__file__).parent / "test_data"
 TEST_DIR = TEST_DATA / "era5_run000"
@@ -22,3 +29,57 @@ def test_check_far_from_boundaries(trackrun):
     assert misc.check_far_from_boundaries(a_track, [-20, 30, 65, 80], dist=200)
     assert not misc.check_far_from_boundaries(a_track, [-10, 30, 73, 80], dist=200)
     assert not misc.check_far_from_boundaries(a_track, [-20, 30, 70, 80], dist=1e3)
+
+
+def test_calc_all_dens(trackrun):
+    """Compare densities calculated at once with those calculated one by one."""
+    trackrun.classify([("a", ["lifetime_h >= 6"]), ("b", ["gen_lys_dist_km > 300"])])
+    lon, lat = np.arange(-20.0, 50.0, 1.0), np.arange(60.0, 85.0, 1.0)
+    subsets = ["all", "a", "b"]
+    act = misc.calc_all_dens(trackrun, lon, lat, subsets=subsets)
+    assert act.dims == ("subset", "dens_type", "latitude", "longitude")
+    for subset in subsets:
+        for by in misc.DENSITY_TYPES:
+            des = trackrun.density(lon, lat, by=by, subset=subset)
+            xr.testing.assert_equal(act.sel(subset=subset, dens_type=by, drop=True), des)
+    # A precomputed grid is used as is
+    grid = Grid.from_coords(lon, lat)
+    xr.testing.assert_equal(misc.calc_all_dens(trackrun, grid, subsets=subsets), act)
+    xr.testing.assert_equal(
+        misc.calc_all_dens(trackrun, grid, subsets=subsets, grid_centres=False), act
+    )
+    trackrun.clear_categories()
+
+
+@pytest.mark.parametrize("check_domain_bounds", [True, False])
+def test_mask_index(trackrun, check_domain_bounds):
+    """Compare check_by_mask() using MaskIndex with the one using DataArray."""
+    lon, lat = np.arange(-20.0, 50.0, 0.25), np.arange(60.0, 85.0, 0.25)
+    lsm = xr.DataArray(
+        (np.random.RandomState(0).rand(lat.size, lon.size) > 0.995) * 1.0,
+        dims=("latitude", "longitude"),
+        coords={"latitude": lat, "longitude": lon},
+    )
+    extent = trackrun.conf.extent if check_domain_bounds else None
+    mask_index = misc.MaskIndex(lsm, extent=extent)
+    for _, ot in trackrun.gb:
+        des = misc.check_by_mask(
+            ot, trackrun, lsm, dist=40.0, check_domain_bounds=check_domain_bounds
+        )
+        assert misc.check_by_mask(ot, trackrun, mask_index, dist=40.0) == des
+
+
+def test_mask_index_without_scipy(trackrun, monkeypatch):
+    """Check that MaskIndex warns and gives the same result without scipy."""
+    lon, lat = np.arange(-20.0, 50.0, 1.0), np.arange(60.0, 85.0, 1.0)
+    lsm = xr.DataArray(
+        (np.random.RandomState(0).rand(lat.size, lon.size) > 0.95) * 1.0,
+        dims=("latitude", "longitude"),
+        coords={"latitude": lat, "longitude": lon},
+    )
+    des = misc.MaskIndex(lsm)
+    monkeypatch.setitem(sys.modules, "scipy.spatial", None)
+    with pytest.warns(MissingDependencyWarning):
+        act = misc.MaskIndex(lsm)
+    for _, ot in trackrun.gb:
+        assert misc.check_by_mask(ot, trackrun, act) == misc.check_by_mask(ot, trackrun, des)
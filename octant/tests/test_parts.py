@@ -1,8 +1,14 @@
 """Test parts submodule."""
 from pathlib import Path
 
+import numpy as np
+import numpy.testing as npt
+
 from octant import parts
 from octant.exceptions import LoadError
+from octant.params import MUX_NAMES
+
+import pandas as pd
 
 import pytest
 
@@ -47,3 +53,28 @@ def test_loaderror():
     """Test raising LoadError."""
     with pytest.raises(LoadError):
         parts.TrackSettings(str(TEST_FNAME))
+
+
+def test_trackcolumns():
+    """Test TrackColumns round trip and per-track views."""
+    mux = pd.MultiIndex.from_arrays([[3, 3, 1, 1, 1], [0, 1, 0, 1, 2]], names=MUX_NAMES)
+    df = parts.OctantTrack(
+        {"lon": [1.0, 2.0, 3.0, 4.0, 5.0], "lat": [6.0, 7.0, 8.0, 9.0, 10.0]}, index=mux
+    )
+    cols = parts.TrackColumns.from_df(df)
+    assert len(cols) == 2
+    assert cols.n_points == 5
+    npt.assert_array_equal(cols.track_ids, [1, 3])
+    npt.assert_array_equal(cols.track_offsets, [0, 3, 5])
+    npt.assert_array_equal(cols.reduceat(np.maximum, "lat"), [10.0, 7.0])
+    npt.assert_array_equal(cols.last("lon"), [5.0, 2.0])
+    idx, track = list(cols)[1]
+    assert idx == 3
+    assert np.shares_memory(track["lon"], cols["lon"])
+    npt.assert_array_equal(track["lon"], [1.0, 2.0])
+    assert cols.to_df().equals(df.sort_index(level=0, sort_remaining=False))
+    sub = cols.take([1])
+    npt.assert_array_equal(sub.track_ids, [3])
+    npt.assert_array_equal(sub.track_offsets, [0, 2])
+    npt.assert_array_equal(sub["lon"], [1.0, 2.0])
+    assert len(cols.take([])) == 0
@@ -1,8 +1,41 @@
 """Test the utils submodule."""
-# import numpy as np
+import numpy as np
 import numpy.testing as npt
 
-from octant.utils import great_circle
+from octant.utils import (
+    distance_matrix,
+    distance_metric,
+    great_circle,
+    mean_arr_along_track,
+    parse_vortrack,
+    point_density_cell,
+    point_density_cell_1d,
+    point_density_rad,
+    point_density_rad_1d,
+    track_density_cell,
+    track_density_cell_1d,
+    track_density_rad,
+    track_density_rad_1d,
+)
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def lonlat():
+    """Random track points, including some on cell boundaries and outside of the grid."""
+    rng = np.random.RandomState(0)
+    pts = np.column_stack([rng.uniform(-20, 50, 500), rng.uniform(60, 85, 500)])
+    edges = np.array([[-15.0, 65.0], [45.0, 80.0], [0.0, 70.0], [44.99, 79.99], [np.nan, 70.0]])
+    return np.concatenate([pts, edges]).astype("double", order="C")
+
+
+@pytest.fixture(scope="module")
+def bounds():
+    """1D arrays of non-uniformly spaced cell boundaries."""
+    lon = np.concatenate([np.arange(-15.0, 30.0, 1.0), np.arange(30.0, 45.1, 2.5)])
+    lat = np.arange(65.0, 80.1, 0.5)
+    return lon.astype("double", order="C"), lat.astype("double", order="C")
 
 
 def test_great_circle():
@@ -11,3 +44,127 @@ def test_great_circle():
     true_dist = 1435334.9068947
 
     npt.assert_almost_equal(dist, true_dist)
+
+
+def test_point_density_cell_1d(lonlat, bounds):
+    """Compare binned point density with the brute-force kernel."""
+    lon2d, lat2d = np.meshgrid(*bounds)
+    des = point_density_cell(
+        lon2d.astype("double", order="C"), lat2d.astype("double", order="C"), lonlat
+    ).base
+    act = point_density_cell_1d(*bounds, lonlat).base
+    assert act.shape == (bounds[1].shape[0] - 1, bounds[0].shape[0] - 1)
+    npt.assert_array_equal(act, des)
+
+
+def test_track_density_cell_1d(lonlat, bounds):
+    """Compare single-pass track density with the brute-force kernel."""
+    lon2d, lat2d = [a.astype("double", order="C") for a in np.meshgrid(*bounds)]
+    # Slow-moving tracks, so that each track visits the same cell several times
+    track_idx = np.repeat(np.arange(lonlat.shape[0] // 5), 5)
+    tridlonlat = np.column_stack([track_idx, np.sort(lonlat[: track_idx.shape[0]], axis=0)])
+    tridlonlat = tridlonlat.astype("double", order="C")
+    des = track_density_cell(lon2d, lat2d, tridlonlat).base
+    act = track_density_cell_1d(*bounds, tridlonlat).base
+    assert act.sum() < tridlonlat.shape[0]
+    npt.assert_array_equal(act, des)
+
+
+@pytest.mark.parametrize(
+    "lon1d, lat1d",
+    [
+        (np.arange(-15.0, 45.1, 1.0), np.arange(65.0, 80.1, 1.0)),
+        # global grid, to check periodicity in longitude and pole proximity
+        (np.arange(0.0, 360.0, 5.0), np.arange(-90.0, 90.1, 5.0)),
+    ],
+)
+def test_density_rad_1d(lonlat, lon1d, lat1d):
+    """Compare windowed radius density with the brute-force kernels."""
+    dist = 555e3
+    lon1d = lon1d.astype("double", order="C")
+    lat1d = lat1d.astype("double", order="C")
+    lon2d, lat2d = [a.astype("double", order="C") for a in np.meshgrid(lon1d, lat1d)]
+    des = point_density_rad(lon2d, lat2d, lonlat, dist).base
+    act = point_density_rad_1d(lon1d, lat1d, lonlat, dist).base
+    npt.assert_array_equal(act, des)
+
+    track_idx = np.repeat(np.arange(lonlat.shape[0] // 5), 5)
+    tridlonlat = np.column_stack([track_idx, lonlat[: track_idx.shape[0]]])
+    tridlonlat = tridlonlat.astype("double", order="C")
+    des = track_density_rad(lon2d, lat2d, tridlonlat, dist).base
+    act = track_density_rad_1d(lon1d, lat1d, tridlonlat, dist).base
+    npt.assert_array_equal(act, des)
+
+
+def test_kernels_num_threads(lonlat, bounds):
+    """Check that multi-threaded kernels give the same result as single-threaded ones."""
+    track_idx = np.repeat(np.arange(lonlat.shape[0] // 5), 5)
+    tridlonlat = np.column_stack([track_idx, lonlat[: track_idx.shape[0]]])
+    tridlonlat = tridlonlat.astype("double", order="C")
+    for func, args in [
+        (point_density_cell_1d, (*bounds, lonlat)),
+        (track_density_cell_1d, (*bounds, tridlonlat)),
+        (point_density_rad_1d, (*bounds, lonlat, 333e3)),
+        (track_density_rad_1d, (*bounds, tridlonlat, 333e3)),
+    ]:
+        des = func(*args, num_threads=1).base
+        act = func(*args, num_threads=4).base
+        npt.assert_array_equal(act, des)
+
+    lon2d, lat2d = [a.astype("double", order="C") for a in np.meshgrid(*bounds)]
+    mask = (lon2d > 20.0).astype("double", order="C")
+    npt.assert_array_equal(
+        mean_arr_along_track(mask, lon2d, lat2d, lonlat, 100e3, num_threads=4).base,
+        mean_arr_along_track(mask, lon2d, lat2d, lonlat, 100e3, num_threads=1).base,
+    )
+
+
+def test_distance_matrix(lonlat):
+    """Compare the batched distance matrix with the pairwise distance metric."""
+    time = np.arange(lonlat.shape[0], dtype="int64") * 3_600_000_000_000
+    offsets1 = np.array([0, 5, 12, 20], dtype=np.intp)
+    offsets2 = np.array([20, 24, 30], dtype=np.intp)
+    act = distance_matrix(
+        lonlat[:, 0].copy(),
+        lonlat[:, 1].copy(),
+        time,
+        offsets1,
+        lonlat[:, 0].copy(),
+        lonlat[:, 1].copy(),
+        time,
+        offsets2,
+        beta=50.0,
+        num_threads=2,
+    ).base
+    assert act.shape == (3, 2)
+    for i, (a, b) in enumerate(zip(offsets1[:-1], offsets1[1:])):
+        track1 = (lonlat[a:b, 0], lonlat[a:b, 1], time[a:b])
+        for j, (c, d) in enumerate(zip(offsets2[:-1], offsets2[1:])):
+            track2 = (lonlat[c:d, 0], lonlat[c:d, 1], time[c:d])
+            npt.assert_equal(act[i, j], distance_metric(*track1, *track2, beta=50.0))
+
+
+def test_parse_vortrack():
+    """Parse a vortrack file with an extra column and check malformed input."""
+    data = (
+        b"    39.90000    70.50000     0.22999   201303230100     2627.86182  0  998.5\n"
+        b"    40.20000    70.60000     0.24000   201303231300     2700.00000  1  997.0\n"
+    )
+    values, time = parse_vortrack(data, n_cols=7)
+    npt.assert_array_equal(values[:, [0, 6]], [[39.9, 998.5], [40.2, 997.0]])
+    npt.assert_array_equal(
+        time.view("datetime64[ns]"),
+        np.array(["2013-03-23T01:00", "2013-03-23T13:00"], dtype="datetime64[ns]"),
+    )
+    # Blank lines are skipped
+    values, time = parse_vortrack(b"\n" + data.replace(b"\n", b"\n\n"), n_cols=7)
+    assert values.shape == (2, 7)
+    # Errors point to the line of the file
+    for bad, n_cols, msg in [
+        (data, 6, "Line 1: more than 6 values"),
+        (data.replace(b"  1  997.0", b""), 7, "Line 2: expected 7 values, found 5"),
+        (data.replace(b"0.24000", b"nope"), 7, "Line 2, column 3: could not parse"),
+        (data.replace(b"1300", b"2500"), 7, "Line 2, column 4: time value"),
+    ]:
+        with pytest.raises(ValueError, match=msg):
+            parse_vortrack(bad, n_cols=n_cols)
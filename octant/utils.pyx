@@ -5,9 +5,12 @@ Part of the octant package.
 Optimized functions for working with cyclone tracks.
 """
 cimport cython
+from cython.parallel cimport parallel, prange, threadid
 import numpy as np
 cimport numpy as np
-from libc.math cimport pi, sin, cos, acos
+from libc.math cimport pi, sin, cos, acos, asin, ceil, floor
+from libc.stdlib cimport strtod, strtoll
+from libc.stdint cimport int64_t
 
 from .params import EARTH_RADIUS
 
@@ -16,7 +19,7 @@ cdef double _great_circle(double lon1,
                           double lon2,
                           double lat1,
                           double lat2,
-                          double r_planet=EARTH_RADIUS):
+                          double r_planet=EARTH_RADIUS) nogil:
     """
     See the docstring for great_circle()
     """
@@ -73,6 +76,43 @@ cpdef double great_circle(double lon1,
     return _great_circle(lon1, lon2, lat1, lat2, r_planet=r_planet)
 
 
+cpdef double[::1] great_circle_arr(const double[::1] lon1,
+                                   const double[::1] lon2,
+                                   const double[::1] lat1,
+                                   const double[::1] lat2,
+                                   double r_planet=EARTH_RADIUS):
+    """
+    Calculate great circle distances between two arrays of points on a sphere
+
+    Parameters
+    ----------
+    lon1: double, shape(N, )
+        Longitudes of the first points
+    lon2: double, shape(N, )
+        Longitudes of the second points
+    lat1: double, shape(N, )
+        Latitudes of the first points
+    lat2: double, shape(N, )
+        Latitudes of the second points
+    r_planet: double, optional
+        Radius of the planet in metres
+        Default: EARTH_RADIUS
+
+    Returns
+    -------
+    dist: double, shape(N, )
+        Distances in metres
+    """
+    cdef Py_ssize_t p
+    cdef Py_ssize_t pmax = lon1.shape[0]
+    cdef double[::1] dist = np.empty(pmax, dtype="double")
+
+    with nogil:
+        for p in range(pmax):
+            dist[p] = _great_circle(lon1[p], lon2[p], lat1[p], lat2[p], r_planet=r_planet)
+    return dist
+
+
 cpdef double total_dist(double[:, ::1] lonlat):
     """
     Calculate the total distance given an array of longitudes and latitudes
@@ -99,8 +139,8 @@ cpdef double total_dist(double[:, ::1] lonlat):
 
 
 # Density functions
-cpdef double[:, ::1] point_density_cell(double[:, ::1] lon2d,
-                                        double[:, ::1] lat2d,
+cpdef double[:, ::1] point_density_cell(const double[:, ::1] lon2d,
+                                        const double[:, ::1] lat2d,
                                         double[:, ::1] lonlat):
     """
     Calculate density in lon-lat grid cell boxes.
@@ -122,6 +162,8 @@ cpdef double[:, ::1] point_density_cell(double[:, ::1] lon2d,
     Note
     ----
     `lon2d` and `lat2d` define the boundaries of grid cells, not centres.
+    Single-threaded reference implementation; `TrackRun.density()` uses
+    the multi-threaded `point_density_cell_1d()`.
     """
     cdef int i, j, p
     cdef int jmax = lat2d.shape[0]-1
@@ -140,8 +182,116 @@ cpdef double[:, ::1] point_density_cell(double[:, ::1] lon2d,
     return count
 
 
-cpdef double[:, ::1] track_density_cell(double[:, ::1] lon2d,
-                                        double[:, ::1] lat2d,
+cdef inline int _bin_index(const double[::1] bounds, double x) nogil:
+    """
+    Find index of the cell [bounds[k], bounds[k+1]) containing `x` by binary search.
+
+    Returns -1 if `x` is outside of the bounds (or NaN).
+    """
+    cdef int lo = 0
+    cdef int hi = bounds.shape[0] - 1
+    cdef int mid
+
+    if hi < 1:
+        return -1
+    if not ((bounds[0] <= x) and (bounds[hi] > x)):
+        return -1
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if bounds[mid] <= x:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+cdef Py_ssize_t[::1] _track_segments(double[:, ::1] id_lon_lat):
+    """Offsets of runs of points with the same track index, of shape (S+1,)."""
+    track_idx = np.asarray(id_lon_lat)[:, 0]
+    breaks = np.flatnonzero(np.diff(track_idx) != 0) + 1
+    return np.concatenate([[0], breaks, [track_idx.shape[0]]]).astype(np.intp)
+
+
+cdef double[:, ::1] _density_cell_1d(const double[::1] lon_bounds,
+                                     const double[::1] lat_bounds,
+                                     double[:, ::1] pts,
+                                     bint by_track,
+                                     int num_threads):
+    """
+    Cell density engine. See point_density_cell_1d() and track_density_cell_1d().
+
+    If `by_track` is true, `pts` columns are (track index, lon, lat), otherwise (lon, lat).
+    Each thread accumulates counts in its own grid, and the grids are summed at the end.
+    Tracks are processed by one thread each, so track points have to be contiguous.
+    """
+    cdef int i, j, p, s, tid, track_idx
+    cdef int jmax = lat_bounds.shape[0] - 1
+    cdef int imax = lon_bounds.shape[0] - 1
+    cdef int pmax = pts.shape[0]
+    cdef int nt = max(num_threads, 1)
+    cdef int col = 1 if by_track else 0
+    cdef double[:, :, ::1] local_count = np.zeros([nt, jmax, imax], dtype=np.double)
+    cdef int[:, :, ::1] last_track
+    cdef Py_ssize_t[::1] seg
+
+    if by_track:
+        last_track = np.full([nt, jmax, imax], -1, dtype=np.intc)
+        seg = _track_segments(pts)
+    else:
+        # Every point is a segment of its own
+        seg = np.arange(pmax + 1, dtype=np.intp)
+
+    with nogil, parallel(num_threads=nt):
+        for s in prange(seg.shape[0] - 1, schedule="dynamic"):
+            tid = threadid()
+            for p in range(seg[s], seg[s + 1]):
+                i = _bin_index(lon_bounds, pts[p, col])
+                if i < 0:
+                    continue
+                j = _bin_index(lat_bounds, pts[p, col + 1])
+                if j < 0:
+                    continue
+                if by_track:
+                    track_idx = <int>pts[p, 0]
+                    if last_track[tid, j, i] == track_idx:
+                        continue
+                    last_track[tid, j, i] = track_idx
+                local_count[tid, j, i] = local_count[tid, j, i] + 1
+    return np.asarray(local_count).sum(axis=0)
+
+
+cpdef double[:, ::1] point_density_cell_1d(const double[::1] lon_bounds,
+                                           const double[::1] lat_bounds,
+                                           double[:, ::1] lonlat,
+                                           int num_threads=1):
+    """
+    Calculate density in lon-lat grid cell boxes given 1D cell boundaries.
+
+    Gives the same result as point_density_cell(), but instead of scanning
+    all grid cells for each point, the cell is found by a binary search
+    over the boundaries, so the cost scales with the number of points.
+
+    Parameters
+    ----------
+    lon_bounds: numpy.array
+        Array of longitude cell boundaries of shape (N+1,) in ascending order
+    lat_bounds: numpy.array
+        Array of latitude cell boundaries of shape (M+1,) in ascending order
+    lonlat: numpy.array
+        Array of track's longitude and latitude; of shape(P, 2)
+    num_threads: int, optional
+        Number of OpenMP threads
+
+    Returns
+    -------
+    count: numpy.array
+        Cyclone point occurence in each grid cell; of shape (M, N)
+    """
+    return _density_cell_1d(lon_bounds, lat_bounds, lonlat, False, num_threads)
+
+
+cpdef double[:, ::1] track_density_cell(const double[:, ::1] lon2d,
+                                        const double[:, ::1] lat2d,
                                         double[:, ::1] id_lon_lat):
     """
     Calculate cyclone track density in lon-lat grid cell boxes.
@@ -163,6 +313,8 @@ cpdef double[:, ::1] track_density_cell(double[:, ::1] lon2d,
     Note
     ----
     `lon2d` and `lat2d` define the boundaries of grid cells, not centres.
+    Single-threaded reference implementation; `TrackRun.density()` uses
+    the multi-threaded `track_density_cell_1d()`.
     """
     cdef int i, j, p
     cdef int jmax = lat2d.shape[0] - 1
@@ -188,14 +340,48 @@ cpdef double[:, ::1] track_density_cell(double[:, ::1] lon2d,
     return count
 
 
-cpdef double[:, ::1] point_density_rad(double[:, ::1] lon2d,
-                                       double[:, ::1] lat2d,
+cpdef double[:, ::1] track_density_cell_1d(const double[::1] lon_bounds,
+                                           const double[::1] lat_bounds,
+                                           double[:, ::1] id_lon_lat,
+                                           int num_threads=1):
+    """
+    Calculate cyclone track density in lon-lat grid cell boxes given 1D cell boundaries.
+
+    Gives the same result as track_density_cell(), but walks the points only once:
+    each point is binned using a binary search over the boundaries and each track
+    is counted once per cell by remembering the last track counted in that cell.
+
+    Parameters
+    ----------
+    lon_bounds: numpy.array
+        Array of longitude cell boundaries of shape (N+1,) in ascending order
+    lat_bounds: numpy.array
+        Array of latitude cell boundaries of shape (M+1,) in ascending order
+    id_lon_lat: numpy.array
+        Array of track's index, longitude, and latitude; of shape(P, 3)
+        Points of each track should be contiguous.
+    num_threads: int, optional
+        Number of OpenMP threads
+
+    Returns
+    -------
+    count: numpy.array
+        Cyclone occurence in each grid cell; of shape (M, N)
+    """
+    return _density_cell_1d(lon_bounds, lat_bounds, id_lon_lat, True, num_threads)
+
+
+cpdef double[:, ::1] point_density_rad(const double[:, ::1] lon2d,
+                                       const double[:, ::1] lat2d,
                                        double[:, ::1] lonlat,
                                        double dist,
                                        double r_planet=EARTH_RADIUS):
     """
     Calculate cyclone density within given radius from each grid point
 
+    Single-threaded reference implementation; `TrackRun.density()` uses
+    the multi-threaded `point_density_rad_1d()`.
+
     TODO: account for double-counting!
     """
     cdef int i, j, p
@@ -212,14 +398,17 @@ cpdef double[:, ::1] point_density_rad(double[:, ::1] lon2d,
     return count
 
 
-cpdef double[:, ::1] track_density_rad(double[:, ::1] lon2d,
-                                       double[:, ::1] lat2d,
+cpdef double[:, ::1] track_density_rad(const double[:, ::1] lon2d,
+                                       const double[:, ::1] lat2d,
                                        double[:, ::1] id_lon_lat,
                                        double dist,
                                        double r_planet=EARTH_RADIUS):
     """
     Calculate cyclone track density within given radius from each grid point
 
+    Single-threaded reference implementation; `TrackRun.density()` uses
+    the multi-threaded `track_density_rad_1d()`.
+
     TODO: account for double-counting!
     """
     cdef int i, j, p
@@ -244,14 +433,219 @@ cpdef double[:, ::1] track_density_rad(double[:, ::1] lon2d,
     return count
 
 
+cdef inline int _search_left(const double[::1] arr, double x) nogil:
+    """Index of the first element of sorted `arr` that is not less than `x`."""
+    cdef int lo = 0
+    cdef int hi = arr.shape[0]
+    cdef int mid
+
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if arr[mid] < x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+cdef inline int _search_right(const double[::1] arr, double x) nogil:
+    """Index of the first element of sorted `arr` that is greater than `x`."""
+    cdef int lo = 0
+    cdef int hi = arr.shape[0]
+    cdef int mid
+
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if arr[mid] <= x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+cdef inline double _lon_halfwidth(double lat, double ang) nogil:
+    """
+    Maximum longitude difference (degrees) of points within angular distance `ang` (radians)
+    from a point at latitude `lat` (degrees).
+
+    Returns 360 if the circle contains a pole, i.e. all longitudes have to be checked.
+    """
+    cdef double rad2deg = 180. / pi
+    cdef double ratio
+
+    if abs(lat) + ang * rad2deg >= 90.:
+        return 360.
+    ratio = sin(ang) / cos(lat * pi / 180.)
+    if ratio >= 1.:
+        return 360.
+    return asin(ratio) * rad2deg
+
+
+# Tolerance (degrees) added to search windows, so that the windows are always wider
+# than the great circle distance check applied within them
+cdef double _WINDOW_SLACK = 1e-5
+
+
+cdef double[:, ::1] _density_rad_1d(const double[::1] lon1d,
+                                    const double[::1] lat1d,
+                                    double[:, ::1] pts,
+                                    bint by_track,
+                                    double dist,
+                                    double r_planet,
+                                    int num_threads):
+    """
+    Radius density engine. See point_density_rad_1d() and track_density_rad_1d().
+
+    If `by_track` is true, `pts` columns are (track index, lon, lat), otherwise (lon, lat).
+    Each thread accumulates counts in its own grid, and the grids are summed at the end.
+    Tracks are processed by one thread each, so track points have to be contiguous.
+    """
+    cdef int i, j, p, k, s, tid, i0, i1, j0, j1, kmin, kmax
+    cdef int jmax = lat1d.shape[0]
+    cdef int imax = lon1d.shape[0]
+    cdef int pmax = pts.shape[0]
+    cdef int nt = max(num_threads, 1)
+    cdef int col = 1 if by_track else 0
+    cdef int track_idx = -1
+    cdef double lon, lat, dlon
+    cdef double ang = dist / r_planet
+    cdef double dlat = ang * 180. / pi + _WINDOW_SLACK
+    cdef double[:, :, ::1] local_count = np.zeros([nt, jmax, imax], dtype=np.double)
+    cdef int[:, :, ::1] last_track
+    cdef Py_ssize_t[::1] seg
+
+    if imax == 0:
+        return np.zeros([jmax, imax], dtype=np.double)
+    if by_track:
+        last_track = np.full([nt, jmax, imax], -1, dtype=np.intc)
+        seg = _track_segments(pts)
+    else:
+        # Every point is a segment of its own
+        seg = np.arange(pmax + 1, dtype=np.intp)
+
+    with nogil, parallel(num_threads=nt):
+        for s in prange(seg.shape[0] - 1, schedule="dynamic"):
+            tid = threadid()
+            for p in range(seg[s], seg[s + 1]):
+                lon = pts[p, col]
+                lat = pts[p, col + 1]
+                if lon != lon or lat != lat:
+                    continue
+                if by_track:
+                    track_idx = <int>pts[p, 0]
+                # Latitude rows that can be within `dist`
+                j0 = _search_left(lat1d, lat - dlat)
+                j1 = _search_right(lat1d, lat + dlat)
+                if j0 >= j1:
+                    continue
+                # Longitude bands that can be within `dist`, accounting for periodicity
+                dlon = _lon_halfwidth(lat, ang) + _WINDOW_SLACK
+                if dlon >= 180.:
+                    kmin = 0
+                    kmax = 0
+                else:
+                    kmin = <int>ceil((lon1d[0] - lon - dlon) / 360.)
+                    kmax = <int>floor((lon1d[imax - 1] - lon + dlon) / 360.)
+                for k in range(kmin, kmax + 1):
+                    if dlon >= 180.:
+                        i0 = 0
+                        i1 = imax
+                    else:
+                        i0 = _search_left(lon1d, lon - dlon + 360. * k)
+                        i1 = _search_right(lon1d, lon + dlon + 360. * k)
+                    for j in range(j0, j1):
+                        for i in range(i0, i1):
+                            if _great_circle(lon, lon1d[i],
+                                             lat, lat1d[j], r_planet=r_planet) <= dist:
+                                if by_track:
+                                    if last_track[tid, j, i] == track_idx:
+                                        continue
+                                    last_track[tid, j, i] = track_idx
+                                local_count[tid, j, i] = local_count[tid, j, i] + 1
+    return np.asarray(local_count).sum(axis=0)
+
+
+cpdef double[:, ::1] point_density_rad_1d(const double[::1] lon1d,
+                                          const double[::1] lat1d,
+                                          double[:, ::1] lonlat,
+                                          double dist,
+                                          double r_planet=EARTH_RADIUS,
+                                          int num_threads=1):
+    """
+    Calculate cyclone density within given radius from each point of a lon-lat grid.
+
+    Gives the same result as point_density_rad(), but for each track point only
+    the latitude rows and longitude bands that can be within `dist` are checked.
+
+    Parameters
+    ----------
+    lon1d: numpy.array
+        Array of grid longitudes of shape (N,) in ascending order
+    lat1d: numpy.array
+        Array of grid latitudes of shape (M,) in ascending order
+    lonlat: numpy.array
+        Array of track's longitude and latitude; of shape(P, 2)
+    dist: double
+        Radius in metres
+    r_planet: double, optional
+        Radius of the planet in metres
+        Default: EARTH_RADIUS
+    num_threads: int, optional
+        Number of OpenMP threads
+
+    Returns
+    -------
+    count: numpy.array
+        Number of cyclone points within `dist` of each grid point; of shape (M, N)
+    """
+    return _density_rad_1d(lon1d, lat1d, lonlat, False, dist, r_planet, num_threads)
+
+
+cpdef double[:, ::1] track_density_rad_1d(const double[::1] lon1d,
+                                          const double[::1] lat1d,
+                                          double[:, ::1] id_lon_lat,
+                                          double dist,
+                                          double r_planet=EARTH_RADIUS,
+                                          int num_threads=1):
+    """
+    Calculate cyclone track density within given radius from each point of a lon-lat grid.
+
+    Gives the same result as track_density_rad(), but for each track point only
+    the latitude rows and longitude bands that can be within `dist` are checked.
+
+    Parameters
+    ----------
+    lon1d: numpy.array
+        Array of grid longitudes of shape (N,) in ascending order
+    lat1d: numpy.array
+        Array of grid latitudes of shape (M,) in ascending order
+    id_lon_lat: numpy.array
+        Array of track's index, longitude, and latitude; of shape(P, 3)
+        Points of each track should be contiguous.
+    dist: double
+        Radius in metres
+    r_planet: double, optional
+        Radius of the planet in metres
+        Default: EARTH_RADIUS
+    num_threads: int, optional
+        Number of OpenMP threads
+
+    Returns
+    -------
+    count: numpy.array
+        Number of cyclone tracks within `dist` of each grid point; of shape (M, N)
+    """
+    return _density_rad_1d(lon1d, lat1d, id_lon_lat, True, dist, r_planet, num_threads)
+
+
 # Masking functions
 cdef double _masking_loop_func(double[:, ::1] mask,
-                               double[:, ::1] lon2d,
-                               double[:, ::1] lat2d,
+                               const double[:, ::1] lon2d,
+                               const double[:, ::1] lat2d,
                                double lon,
                                double lat,
                                double dist,
-                               double r_planet=EARTH_RADIUS):
+                               double r_planet=EARTH_RADIUS) nogil:
     """
     Masking function. See mask_tracks() for explanation.
     """
@@ -269,8 +663,8 @@ cdef double _masking_loop_func(double[:, ::1] mask,
 
 
 cpdef double mask_tracks(double[:, ::1] mask,
-                         double[:, ::1] lon2d,
-                         double[:, ::1] lat2d,
+                         const double[:, ::1] lon2d,
+                         const double[:, ::1] lat2d,
                          double[:, ::1] lonlat,
                          double dist,
                          double r_planet=EARTH_RADIUS):
@@ -297,27 +691,32 @@ cpdef double mask_tracks(double[:, ::1] mask,
     Returns
     -------
     Fraction of masked points of the track
+
+    Note
+    ----
+    The loop is serial: this function is called once per track, and tracks are
+    too short to pay for starting a parallel region.
     """
 
     cdef int p
     cdef int pmax = lonlat.shape[0]
-    cdef double points_near_coast
+    cdef double points_near_coast = 0.
 
-    points_near_coast = 0.
-    for p in range(pmax):
-        points_near_coast += _masking_loop_func(mask, lon2d, lat2d,
-                                                lonlat[p, 0], lonlat[p, 1],
-                                                dist, r_planet=r_planet)
+    with nogil:
+        for p in range(pmax):
+            points_near_coast += _masking_loop_func(mask, lon2d, lat2d,
+                                                    lonlat[p, 0], lonlat[p, 1],
+                                                    dist, r_planet=r_planet)
     return points_near_coast / <double>pmax
 
 
 cdef double _arr_around_point(double[:, ::1] mask,
-                              double[:, ::1] lon2d,
-                              double[:, ::1] lat2d,
+                              const double[:, ::1] lon2d,
+                              const double[:, ::1] lat2d,
                               double lon,
                               double lat,
                               double dist,
-                              double r_planet=EARTH_RADIUS):
+                              double r_planet=EARTH_RADIUS) nogil:
     cdef int i, j
     cdef int counter
     cdef int jmax = lon2d.shape[0]
@@ -339,11 +738,12 @@ cdef double _arr_around_point(double[:, ::1] mask,
 
 
 cpdef double[:] mean_arr_along_track(double[:, ::1] arr,
-                                     double[:, ::1] lon2d,
-                                     double[:, ::1] lat2d,
+                                     const double[:, ::1] lon2d,
+                                     const double[:, ::1] lat2d,
                                      double[:, ::1] lonlat,
                                      double dist,
-                                     double r_planet=EARTH_RADIUS):
+                                     double r_planet=EARTH_RADIUS,
+                                     int num_threads=1):
     """
     Calculate the mean of an array along the cyclone track within distance `dist` of each point.
 
@@ -362,6 +762,8 @@ cpdef double[:] mean_arr_along_track(double[:, ::1] arr,
     r_planet: double, optional
         Radius of the planet in metres
         Default: EARTH_RADIUS
+    num_threads: int, optional
+        Number of OpenMP threads
 
     Returns
     -------
@@ -371,8 +773,9 @@ cpdef double[:] mean_arr_along_track(double[:, ::1] arr,
     cdef int pmax = lonlat.shape[0]
     z = np.zeros([pmax], dtype=np.double)
     cdef double[:] area_mean = z
+    cdef int nt = max(num_threads, 1)
 
-    for p in range(pmax):
+    for p in prange(pmax, nogil=True, schedule="dynamic", num_threads=nt):
         area_mean[p] = _arr_around_point(arr, lon2d, lat2d,
                                          lonlat[p, 0], lonlat[p, 1],
                                          dist, r_planet=r_planet)
@@ -533,3 +936,256 @@ cpdef double distance_metric(double[:] x1,
     dm = ((sigma12 - 0.5 * (sigma11 + sigma22)) / (A1 * A2)) ** 0.5
 
     return dm
+
+
+@cython.cdivision(True)
+cdef double _traj_variance_seg(const double[::1] x1,
+                               const double[::1] y1,
+                               const double[::1] t1,
+                               Py_ssize_t start1,
+                               Py_ssize_t end1,
+                               const double[::1] x2,
+                               const double[::1] y2,
+                               const double[::1] t2,
+                               Py_ssize_t start2,
+                               Py_ssize_t end2,
+                               double alpha,
+                               double beta,
+                               double r_planet) nogil:
+    """
+    Same as _traj_variance(), but for tracks given by [start, end) segments of flat arrays.
+    """
+    cdef Py_ssize_t i1, i2
+    cdef double variance_sum
+    cdef double f0
+    cdef double f1
+    cdef double g0
+    cdef double g1
+    cdef double da1
+    cdef double da2
+    cdef double A1
+    cdef double A2
+
+    A1 = t1[end1-1] - t1[start1]
+    A2 = t2[end2-1] - t2[start2]
+
+    variance_sum = 0
+    for i1 in range(start1, end1-1):
+        da1 = t1[i1+1] - t1[i1]
+        for i2 in range(start2, end2-1):
+            da2 = t2[i2+1] - t2[i2]
+            f0 = ( alpha * (_great_circle(x1[i1], x2[i2],
+                                          y1[i1], y2[i2], r_planet=r_planet) ** 2)
+                  + beta * ((t1[i1] - t2[i2])) ** 2 )
+            f1 = ( alpha * (_great_circle(x1[i1+1], x2[i2],
+                                          y1[i1+1], y2[i2], r_planet=r_planet) ** 2)
+                  + beta * ((t1[i1+1] - t2[i2])) ** 2 )
+            g0 = ( alpha * (_great_circle(x1[i1], x2[i2+1],
+                                          y1[i1], y2[i2+1], r_planet=r_planet) ** 2)
+                  + beta * ((t1[i1] - t2[i2+1])) ** 2 )
+            g1 = ( alpha * (_great_circle(x1[i1+1], x2[i2+1],
+                                          y1[i1+1], y2[i2+1], r_planet=r_planet) ** 2)
+                  + beta * ((t1[i1+1] - t2[i2+1])) ** 2 )
+            variance_sum += 0.25 * (f0 + f1 + g0 + g1) * da1 * da2
+    return variance_sum / (A1 * A2)
+
+
+cdef double[::1] _self_variance(const double[::1] x,
+                                const double[::1] y,
+                                const double[::1] t,
+                                const Py_ssize_t[::1] offsets,
+                                double alpha,
+                                double beta,
+                                double r_planet,
+                                int num_threads):
+    """Variance of each track with itself, i.e. sigma11 in distance_metric()."""
+    cdef Py_ssize_t k
+    cdef Py_ssize_t kmax = offsets.shape[0] - 1
+    cdef double[::1] sigma = np.zeros([kmax], dtype=np.double)
+
+    for k in prange(kmax, nogil=True, schedule="dynamic", num_threads=num_threads):
+        sigma[k] = _traj_variance_seg(x, y, t, offsets[k], offsets[k+1],
+                                      x, y, t, offsets[k], offsets[k+1],
+                                      alpha, beta, r_planet)
+    return sigma
+
+
+@cython.cdivision(True)  # Do not check for ZeroDivision errors
+cpdef double[:, ::1] distance_matrix(const double[::1] x1,
+                                     const double[::1] y1,
+                                     const long[::1] t1,
+                                     const Py_ssize_t[::1] offsets1,
+                                     const double[::1] x2,
+                                     const double[::1] y2,
+                                     const long[::1] t2,
+                                     const Py_ssize_t[::1] offsets2,
+                                     double alpha=1.,
+                                     double beta=100.,
+                                     double r_planet=EARTH_RADIUS,
+                                     int num_threads=1):
+    """
+    Calculate the distance metric (eq. (4) in Blender and Schubert (2000)) for all pairs of tracks
+
+    Tracks of each set are packed in flat coordinate arrays, with track `k` occupying
+    elements from offsets[k] to offsets[k+1]. The variance of each track with itself
+    is calculated only once.
+
+    Parameters
+    ----------
+    x1: double, shape(N, )
+        Array of longitudes of the first set of tracks
+    y1: double, shape(N, )
+        Array of latitudes of the first set of tracks
+    t1: long, shape(N, )
+        Array of times (in nanoseconds) of the first set of tracks
+    offsets1: Py_ssize_t, shape(K1+1, )
+        Track offsets of the first set of tracks
+    x2: double, shape(M, )
+        Array of longitudes of the second set of tracks
+    y2: double, shape(M, )
+        Array of latitudes of the second set of tracks
+    t2: long, shape(M, )
+        Array of times (in nanoseconds) of the second set of tracks
+    offsets2: Py_ssize_t, shape(K2+1, )
+        Track offsets of the second set of tracks
+    alpha: double, optional (default: 1)
+        Parameter alpha in eq. (3)
+    beta: double, optional (default: 100)
+        Parameter beta in eq. (3)
+    r_planet: double, optional
+        Radius of the planet in metres
+        Default: EARTH_RADIUS
+    num_threads: int, optional
+        Number of OpenMP threads
+
+    Returns
+    -------
+    dm: double, shape(K1, K2)
+        The distance metric for each pair of tracks
+
+    See Also
+    --------
+    octant.utils.distance_metric
+    """
+    cdef Py_ssize_t i, j, p
+    cdef Py_ssize_t imax = offsets1.shape[0] - 1
+    cdef Py_ssize_t jmax = offsets2.shape[0] - 1
+    cdef int nt = max(num_threads, 1)
+    cdef double nano_s = 1e-9
+    cdef double sigma12
+    cdef double A1
+    cdef double A2
+    cdef double[::1] t1_s = np.zeros([t1.shape[0]], dtype=np.double)
+    cdef double[::1] t2_s = np.zeros([t2.shape[0]], dtype=np.double)
+    cdef double[::1] sigma11
+    cdef double[::1] sigma22
+    cdef double[:, ::1] dm = np.zeros([imax, jmax], dtype=np.double)
+
+    for p in range(t1.shape[0]):
+        t1_s[p] = <double>t1[p] * nano_s
+    for p in range(t2.shape[0]):
+        t2_s[p] = <double>t2[p] * nano_s
+
+    sigma11 = _self_variance(x1, y1, t1_s, offsets1, alpha, beta, r_planet, nt)
+    sigma22 = _self_variance(x2, y2, t2_s, offsets2, alpha, beta, r_planet, nt)
+
+    for i in prange(imax, nogil=True, schedule="dynamic", num_threads=nt):
+        A1 = t1_s[offsets1[i+1]-1] - t1_s[offsets1[i]]
+        for j in range(jmax):
+            A2 = t2_s[offsets2[j+1]-1] - t2_s[offsets2[j]]
+            sigma12 = _traj_variance_seg(x1, y1, t1_s, offsets1[i], offsets1[i+1],
+                                         x2, y2, t2_s, offsets2[j], offsets2[j+1],
+                                         alpha, beta, r_planet)
+            dm[i, j] = ((sigma12 - 0.5 * (sigma11[i] + sigma22[j])) / (A1 * A2)) ** 0.5
+    return dm
+
+
+# Parsers
+
+
+cdef inline int64_t _days_from_civil(int64_t y, int64_t m, int64_t d) nogil:
+    """Number of days since 1970-01-01 of a date in the proleptic Gregorian calendar."""
+    cdef int64_t era, yoe, doy, doe
+    if m <= 2:
+        y -= 1
+    era = (y if y >= 0 else y - 399) // 400
+    yoe = y - era * 400
+    doy = (153 * (m + (-3 if m > 2 else 9)) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+cdef inline bint _is_space(char c) nogil:
+    return c == b' ' or c == b'\t' or c == b'\n' or c == b'\r' or c == b'\v' or c == b'\f'
+
+
+def parse_vortrack(bytes data, int n_cols=6, int time_col=3):
+    """
+    Parse contents of a PMCTRACK "vortrack" file
+
+    Values are separated by whitespace, and each non-empty line contains `n_cols` values.
+    Time is given as an integer of the form YYYYMMDDhhmm.
+
+    Parameters
+    ----------
+    data: bytes
+        Contents of the file
+    n_cols: int, optional
+        Number of columns
+    time_col: int, optional
+        Index of the time column
+
+    Returns
+    -------
+    values: double, shape(N, n_cols)
+        Values of all columns (time column is filled with zeros)
+    time: int64, shape(N, )
+        Time in nanoseconds since 1970-01-01, i.e. `datetime64[ns]` values
+    """
+    cdef const char* ptr = data
+    cdef const char* end = ptr + len(data)
+    cdef char* tok_end
+    cdef Py_ssize_t line = 1
+    cdef Py_ssize_t row = 0
+    cdef Py_ssize_t col = 0
+    cdef Py_ssize_t max_rows = data.count(b"\n") + 1
+    cdef int64_t t, y, mo, d, h, mi
+    cdef double[:, ::1] values = np.zeros([max_rows, n_cols], dtype=np.double)
+    cdef int64_t[::1] time = np.zeros([max_rows], dtype=np.int64)
+
+    while True:
+        while ptr < end and _is_space(ptr[0]) and ptr[0] != b'\n':
+            ptr += 1
+        if ptr >= end or ptr[0] == b'\n':
+            # End of a line; blank lines are skipped
+            if col != 0:
+                if col < n_cols:
+                    raise ValueError(f"Line {line}: expected {n_cols} values, found {col}")
+                row += 1
+                col = 0
+            if ptr >= end:
+                break
+            ptr += 1
+            line += 1
+            continue
+        if col == n_cols:
+            raise ValueError(f"Line {line}: more than {n_cols} values")
+        if col == time_col:
+            t = strtoll(ptr, &tok_end, 10)
+        else:
+            values[row, col] = strtod(ptr, &tok_end)
+        if tok_end == ptr or (tok_end < end and not _is_space(tok_end[0])):
+            raise ValueError(f"Line {line}, column {col + 1}: could not parse value")
+        if col == time_col:
+            y, mo, d = t // 100000000, t // 1000000 % 100, t // 10000 % 100
+            h, mi = t // 100 % 100, t % 100
+            if not (1 <= mo <= 12 and 1 <= d <= 31 and h <= 23 and mi <= 59):
+                raise ValueError(
+                    f"Line {line}, column {col + 1}: time value {t} is not of the form "
+                    "YYYYMMDDhhmm"
+                )
+            time[row] = ((_days_from_civil(y, mo, d) * 24 + h) * 60 + mi) * 60_000_000_000
+        ptr = tok_end
+        col += 1
+
+    return np.asarray(values)[:row], np.asarray(time)[:row]
@@ -2,12 +2,14 @@
 """Package build and install script."""
 import os
 import sys
+import tempfile
 
 import Cython.Build
 
 import numpy as np
 
 from setuptools import Extension, find_packages, setup
+from distutils.errors import CompileError, LinkError
 
 import versioneer
 
@@ -24,8 +26,40 @@ def get_readme():
         return f.read()
 
 
+class BuildExtOpenMP(Cython.Build.build_ext):
+    """Build extensions with OpenMP if the compiler supports it."""
+
+    def build_extensions(self):
+        """Add OpenMP flags for the compiler and build the extensions."""
+        compile_args, link_args = self.openmp_flags()
+        for ext in self.extensions:
+            ext.extra_compile_args = ext.extra_compile_args + compile_args
+            ext.extra_link_args = ext.extra_link_args + link_args
+        super().build_extensions()
+
+    def openmp_flags(self):
+        """Get compile and link flags for OpenMP, or no flags if it is not available."""
+        if self.compiler.compiler_type == "msvc":
+            return ["/openmp"], []
+        flags = ["-fopenmp"]
+        # E.g. Apple clang without libomp: build without OpenMP, so that prange loops are serial
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src = os.path.join(tmp_dir, "check_openmp.c")
+            with open(src, "w") as f:
+                f.write("#include <omp.h>\nint main(void) { return omp_get_max_threads() < 1; }\n")
+            try:
+                objects = self.compiler.compile([src], output_dir=tmp_dir, extra_postargs=flags)
+                self.compiler.link_executable(
+                    objects, os.path.join(tmp_dir, "check_openmp"), extra_postargs=flags
+                )
+            except (CompileError, LinkError):
+                print("OpenMP is not available, octant.utils is built without it")
+                return [], []
+        return flags, flags
+
+
 CMDCLASS = versioneer.get_cmdclass()
-CMDCLASS.update({"build_ext": Cython.Build.build_ext})
+CMDCLASS.update({"build_ext": BuildExtOpenMP})
 
 
 setup(
@@ -55,6 +89,7 @@ setup(
         "pandas>=0.20",
         "xarray>=0.10.0",
     ],
+    extras_require={"mask": ["scipy"], "parquet": ["pyarrow"]},
     classifiers=[
         "Intended Audience :: Science/Research",
         "Natural Language :: English",